@@ -0,0 +1,85 @@
+"""
+Бенчмарк форматов ответа для GET /groups.
+Сравнивает размер тела и время кодирования для JSON и MessagePack
+без сжатия, с gzip и с brotli
+
+Запуск из корня проекта (нужен .env, как для самого приложения):
+    python -m benchmarks.bench_encoding --groups 50 --students 200
+"""
+import argparse
+import json
+import time
+
+import msgpack
+from pydantic import TypeAdapter
+from src.api.encoding import compress
+from src.config import settings
+from src.schemas.schemas import GroupWithStudents
+
+
+def make_payload(groups: int, students: int) -> list[dict]:
+    """Синтетический ответ GET /groups в том виде, в каком его получает класс ответа"""
+    data = [
+        {
+            "id": group_id,
+            "name": f"CS-{group_id:04d}",
+            "description": f"Группа номер {group_id}",
+            "students": [
+                {
+                    "id": group_id * students + i,
+                    "first_name": f"Имя{i}",
+                    "last_name": f"Фамилия{group_id * students + i}",
+                    "email": f"student{group_id * students + i}@example.com",
+                }
+                for i in range(students)
+            ],
+        }
+        for group_id in range(groups)
+    ]
+    adapter = TypeAdapter(list[GroupWithStudents])
+    return adapter.dump_python(adapter.validate_python(data), mode="json")
+
+
+def encode_json(content) -> bytes:
+    """Так же, как starlette.responses.JSONResponse"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def measure(func, repeat: int) -> tuple[bytes, float]:
+    """Результат функции и среднее время одного вызова в миллисекундах"""
+    result = func()
+    started = time.process_time()
+    for _ in range(repeat):
+        func()
+    return result, (time.process_time() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--students", type=int, default=200, help="студентов в каждой группе")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    content = make_payload(args.groups, args.students)
+    formats = {
+        "json": lambda: encode_json(content),
+        "json+gzip": lambda: compress(encode_json(content), "gzip"),
+        "json+br": lambda: compress(encode_json(content), "br"),
+        "msgpack": lambda: msgpack.packb(content),
+        "msgpack+gzip": lambda: compress(msgpack.packb(content), "gzip"),
+        "msgpack+br": lambda: compress(msgpack.packb(content), "br"),
+    }
+
+    print(f"{args.groups} групп x {args.students} студентов, "
+          f"gzip level {settings.COMPRESSION_GZIP_LEVEL}, brotli quality {settings.COMPRESSION_BROTLI_QUALITY}")
+    print(f"{'формат':<14}{'байт':>12}{'% от json':>12}{'CPU, мс':>12}")
+    baseline = None
+    for name, func in formats.items():
+        body, cpu_ms = measure(func, args.repeat)
+        baseline = baseline or len(body)
+        print(f"{name:<14}{len(body):>12}{len(body) / baseline * 100:>11.1f}%{cpu_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Бенчмарк хеш-секционирования таблицы связей на PostgreSQL.
+Создаёт две копии схемы студентов, групп и связей - с обычной и с секционированной
+таблицей связей - с одинаковыми данными. Таблицы связей устроены как настоящая:
+внешние ключи с ON DELETE CASCADE, колонки времени и те же индексы.
+Сравниваются запросы GroupRepository (вставка и удаление связи, состав группы,
+группы студента) и удаление студента и группы, связи которых удаляет каскад.
+Для каждого запроса выводится, сколько секций он читает (EXPLAIN; для каскада -
+запрос, который выполняет триггер внешнего ключа)
+
+Таблицы bench_plain_* и bench_hash_* создаются заново и удаляются в конце.
+Запуск из корня проекта (нужен .env с доступом к БД):
+    python -m benchmarks.bench_partitioning --rows 10000000 --groups 100000 --partitions 16
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+from src.database.database import engine
+
+STUDENTS_PER_ROW = 4  # в среднем у студента 4 группы
+
+VARIANTS = {"обычная": "bench_plain", "секции": "bench_hash"}
+
+# Запросы: {prefix} - префикс таблиц варианта
+QUERIES = {
+    "insert": (
+        "INSERT INTO {prefix}_membership (student_id, group_id) VALUES (:student_id, :group_id) "
+        "ON CONFLICT DO NOTHING"
+    ),
+    "delete": "DELETE FROM {prefix}_membership WHERE student_id = :student_id AND group_id = :group_id",
+    "group_members": "SELECT student_id FROM {prefix}_membership WHERE group_id = :group_id",
+    "student_groups": "SELECT group_id FROM {prefix}_membership WHERE student_id = :student_id",
+    "delete_student": "DELETE FROM {prefix}_students WHERE id = :student_id",
+    "delete_group": "DELETE FROM {prefix}_groups WHERE id = :group_id",
+}
+
+# Что читает каскадное удаление: триггер внешнего ключа удаляет связи по одному ключу
+CASCADE_QUERIES = {
+    "delete_student": "DELETE FROM {prefix}_membership WHERE student_id = :student_id",
+    "delete_group": "DELETE FROM {prefix}_membership WHERE group_id = :group_id",
+}
+
+
+async def drop_tables(conn) -> None:
+    for prefix in VARIANTS.values():
+        await conn.execute(text(
+            f"DROP TABLE IF EXISTS {prefix}_membership, {prefix}_students, {prefix}_groups CASCADE"
+        ))
+
+
+async def create_tables(rows: int, groups: int, partitions: int, key: str) -> None:
+    """Создать обе схемы и заполнить их одинаковыми данными на стороне сервера"""
+    students = max(rows // STUDENTS_PER_ROW, 1)
+    async with engine.begin() as conn:
+        await drop_tables(conn)
+        for label, prefix in VARIANTS.items():
+            await conn.execute(text(
+                f"CREATE TABLE {prefix}_students (id serial PRIMARY KEY, first_name varchar(100) NOT NULL, "
+                f"last_name varchar(100) NOT NULL, email varchar(200) NOT NULL UNIQUE)"
+            ))
+            await conn.execute(text(
+                f"CREATE TABLE {prefix}_groups (id serial PRIMARY KEY, name varchar(100) NOT NULL UNIQUE, "
+                f"description varchar(500))"
+            ))
+            partition_by = f" PARTITION BY HASH ({key})" if label == "секции" else ""
+            await conn.execute(text(
+                f"CREATE TABLE {prefix}_membership ("
+                f"student_id integer NOT NULL REFERENCES {prefix}_students (id) ON DELETE CASCADE, "
+                f"group_id integer NOT NULL REFERENCES {prefix}_groups (id) ON DELETE CASCADE, "
+                f"created_at timestamptz NOT NULL DEFAULT now(), updated_at timestamptz NOT NULL DEFAULT now(), "
+                f"PRIMARY KEY (student_id, group_id)){partition_by}"
+            ))
+            if partition_by:
+                for remainder in range(partitions):
+                    await conn.execute(text(
+                        f"CREATE TABLE {prefix}_membership_p{remainder} PARTITION OF {prefix}_membership "
+                        f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+                    ))
+            await conn.execute(text(f"CREATE INDEX ON {prefix}_membership (group_id, student_id)"))
+            await conn.execute(text(f"CREATE INDEX ON {prefix}_membership (updated_at, student_id, group_id)"))
+
+            await conn.execute(text(
+                f"INSERT INTO {prefix}_students (first_name, last_name, email) "
+                f"SELECT 'Bench', 'Student' || i, 'bench' || i || '@example.com' "
+                f"FROM generate_series(1, {students}) AS i"
+            ))
+            await conn.execute(text(
+                f"INSERT INTO {prefix}_groups (name) SELECT 'bench-' || i FROM generate_series(1, {groups}) AS i"
+            ))
+            await conn.execute(text(
+                f"INSERT INTO {prefix}_membership (student_id, group_id) "
+                f"SELECT (i * 7919) % {students} + 1, i % {groups} + 1 FROM generate_series(1, {rows}::bigint) AS i "
+                f"ON CONFLICT DO NOTHING"
+            ))
+            for table in ("students", "groups", "membership"):
+                await conn.execute(text(f"ANALYZE {prefix}_{table}"))
+
+
+async def scanned_partitions(query: str, params: dict) -> int:
+    """Сколько таблиц или секций читает план запроса"""
+    async with engine.connect() as conn:
+        plan = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params)).scalar()
+
+    def walk(node: dict) -> int:
+        own = 1 if "Relation Name" in node else 0
+        return own + sum(walk(child) for child in node.get("Plans", []))
+
+    root = plan[0]["Plan"]
+    if root["Node Type"] != "ModifyTable":
+        return walk(root)
+    # У INSERT и DELETE корень плана - сама таблица, считаются чтения под ним;
+    # INSERT ... VALUES ничего не читает и пишет в одну секцию
+    return sum(walk(child) for child in root.get("Plans", [])) or 1
+
+
+async def measure(query: str, operations: list[dict]) -> list[float]:
+    """Время каждого запроса, каждый - в своей транзакции, как в репозитории"""
+    samples = []
+    statement = text(query)
+    async with engine.connect() as conn:
+        for params in operations:
+            started = time.perf_counter()
+            await conn.execute(statement, params)
+            await conn.commit()
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def make_operations(rows: int, groups: int, operations: int) -> dict[str, list[dict]]:
+    """Параметры запросов: одни и те же для обеих схем, удаляемые ID не повторяются"""
+    students = max(rows // STUDENTS_PER_ROW, 1)
+    random.seed(42)
+    pairs = [
+        {"student_id": random.randint(1, students), "group_id": random.randint(1, groups)}
+        for _ in range(operations)
+    ]
+    return {
+        "insert": pairs,
+        "delete": pairs,
+        "group_members": pairs,
+        "student_groups": pairs,
+        "delete_student": [
+            {"student_id": student_id} for student_id in random.sample(range(1, students + 1), min(operations, students))
+        ],
+        "delete_group": [
+            {"group_id": group_id} for group_id in random.sample(range(1, groups + 1), min(operations, groups // 2))
+        ],
+    }
+
+
+async def run(rows: int, groups: int, partitions: int, key: str, operations: int):
+    # Лог SQL движка исказил бы замеры
+    engine.sync_engine.echo = False
+    print(f"Заполнение: {rows} связей, {groups} групп, {partitions} секций по {key}...")
+    started = time.perf_counter()
+    await create_tables(rows, groups, partitions, key)
+    print(f"Готово за {time.perf_counter() - started:.1f} с")
+
+    params = make_operations(rows, groups, operations)
+    print(f"{'запрос':<16}{'таблица':<10}{'секций':>8}{'p50, мс':>11}{'p95, мс':>11}")
+    for name, query in QUERIES.items():
+        for label, prefix in VARIANTS.items():
+            explained = CASCADE_QUERIES.get(name, query).format(prefix=prefix)
+            scanned = await scanned_partitions(explained, params[name][0])
+            values = sorted(await measure(query.format(prefix=prefix), params[name]))
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            print(f"{name:<16}{label:<10}{scanned:>8}{statistics.median(values):>11.3f}{p95:>11.3f}")
+
+    async with engine.begin() as conn:
+        await drop_tables(conn)
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--groups", type=int, default=10_000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--key", choices=["group_id", "student_id"], default="group_id")
+    parser.add_argument("--operations", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.groups, args.partitions, args.key, args.operations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Бенчмарк чтения списков GET /students и GET /groups на PostgreSQL.
+Сравнивает прежний путь через ORM (select(Model) + selectinload, объекты
+в identity map сессии) с путём через Core (json_agg, строки-dataclass со slots):
+память на строку, пока результат жив, и пропускную способность вместе
+с валидацией и сериализацией ответа, как в эндпоинте
+
+Запуск из корня проекта (нужен .env с доступом к БД):
+    python -m benchmarks.bench_read_path --students 20000 --groups 200
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+
+from pydantic import TypeAdapter
+from sqlalchemy import select, insert, delete
+from sqlalchemy.orm import selectinload
+from src.database.database import async_session_maker, engine, Base
+from src.models.models import Student, Group, student_group_association
+from src.repositories.repositories import StudentRepository, GroupRepository
+from src.schemas.schemas import StudentWithGroups, GroupWithStudents
+
+GROUPS_PER_STUDENT = 2
+
+STUDENTS_ADAPTER = TypeAdapter(list[StudentWithGroups])
+GROUPS_ADAPTER = TypeAdapter(list[GroupWithStudents])
+
+
+async def orm_students(session):
+    """GET /students до перехода на Core"""
+    stmt = select(Student).options(selectinload(Student.groups)).order_by(Student.id)
+    return list((await session.execute(stmt)).scalars().all())
+
+
+async def orm_groups(session):
+    """GET /groups до перехода на Core"""
+    stmt = select(Group).options(selectinload(Group.students)).order_by(Group.id)
+    return list((await session.execute(stmt)).scalars().all())
+
+
+async def core_students(session):
+    """GET /students через Core"""
+    return await StudentRepository(session).get_all()
+
+
+async def core_groups(session):
+    """GET /groups через Core"""
+    return await GroupRepository(session).get_all()
+
+
+PATHS = {
+    "GET /students": ((orm_students, core_students), STUDENTS_ADAPTER),
+    "GET /groups": ((orm_groups, core_groups), GROUPS_ADAPTER),
+}
+
+
+async def seed(students: int, groups: int, tag: str) -> None:
+    """Заполнить БД студентами, группами и связями одним запросом на таблицу"""
+    async with async_session_maker() as session:
+        group_ids = (await session.execute(
+            insert(Group).returning(Group.id),
+            [{"name": f"bench-read-{tag}-{i}", "description": f"Группа {i}"} for i in range(groups)]
+        )).scalars().all()
+        student_ids = (await session.execute(
+            insert(Student).returning(Student.id),
+            [
+                {"first_name": "Bench", "last_name": f"Student{i}", "email": f"bench-read-{tag}-{i}@example.com"}
+                for i in range(students)
+            ]
+        )).scalars().all()
+        await session.execute(
+            insert(student_group_association),
+            [
+                {"student_id": student_id, "group_id": group_ids[(i + k) % groups]}
+                for i, student_id in enumerate(student_ids)
+                for k in range(min(GROUPS_PER_STUDENT, groups))
+            ]
+        )
+        await session.commit()
+
+
+async def cleanup(tag: str) -> None:
+    """Удалить данные бенчмарка (связи удаляет ON DELETE CASCADE)"""
+    async with async_session_maker() as session:
+        await session.execute(delete(Student).where(Student.email.like(f"bench-read-{tag}-%")))
+        await session.execute(delete(Group).where(Group.name.like(f"bench-read-{tag}-%")))
+        await session.commit()
+
+
+def count_rows(items: list) -> int:
+    """Строк в ответе, включая вложенные списки"""
+    return sum(1 + len(getattr(item, "groups", None) or getattr(item, "students", None) or ()) for item in items)
+
+
+async def memory_per_row(path) -> tuple[int, float]:
+    """Строк и байт на строку, удерживаемых результатом (и identity map для ORM)"""
+    async with async_session_maker() as session:
+        await path(session)  # прогрев запроса и кешей
+    async with async_session_maker() as session:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        items = await path(session)
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        rows = count_rows(items)
+    return rows, retained / max(rows, 1)
+
+
+async def throughput(path, adapter: TypeAdapter, repeats: int) -> tuple[float, float]:
+    """Среднее время запроса и строк в секунду: чтение + валидация + JSON, как в эндпоинте"""
+    rows = 0
+    started = time.perf_counter()
+    for _ in range(repeats):
+        async with async_session_maker() as session:
+            items = await path(session)
+            adapter.dump_json(adapter.validate_python(items))
+            rows += count_rows(items)
+    elapsed = time.perf_counter() - started
+    return elapsed / repeats * 1000, rows / elapsed
+
+
+async def run(students: int, groups: int, repeats: int):
+    # Лог SQL движка исказил бы замеры
+    engine.sync_engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    tag = uuid.uuid4().hex[:8]
+    await seed(students, groups, tag)
+    try:
+        print(f"{students} студентов, {groups} групп, по {GROUPS_PER_STUDENT} группы у студента")
+        print(f"{'эндпоинт':<16}{'путь':<6}{'строк':>9}{'байт/строка':>13}{'мс/запрос':>11}{'строк/с':>12}")
+        for endpoint, ((orm_path, core_path), adapter) in PATHS.items():
+            for label, path in (("orm", orm_path), ("core", core_path)):
+                rows, per_row = await memory_per_row(path)
+                latency, rate = await throughput(path, adapter, repeats)
+                print(f"{endpoint:<16}{label:<6}{rows:>9}{per_row:>13.0f}{latency:>11.1f}{rate:>12.0f}")
+    finally:
+        await cleanup(tag)
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.students, args.groups, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
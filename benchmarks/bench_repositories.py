@@ -0,0 +1,101 @@
+"""
+Бенчмарк сервисного слоя на выбранном хранилище.
+Запуск с STORAGE_BACKEND=memory даёт нижнюю границу задержки
+(только сервисы и репозитории), с STORAGE_BACKEND=postgres - то же на реальной БД
+
+Запуск из корня проекта:
+    STORAGE_BACKEND=memory python -m benchmarks.bench_repositories --students 2000 --groups 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from src.config import settings
+from src.database.database import async_session_maker, engine, Base
+from src.repositories.memory import InMemoryStudentRepository, InMemoryGroupRepository, memory_storage
+from src.repositories.repositories import StudentRepository, GroupRepository
+from src.schemas.schemas import StudentCreate, GroupCreate
+from src.services.services import StudentService, GroupService
+
+
+@asynccontextmanager
+async def services():
+    """Сервисы на одну "операцию", как их создают зависимости роутеров"""
+    if settings.STORAGE_BACKEND == "memory":
+        yield StudentService(InMemoryStudentRepository(memory_storage)), GroupService(InMemoryGroupRepository(memory_storage))
+        return
+    async with async_session_maker() as session:
+        yield StudentService(StudentRepository(session)), GroupService(GroupRepository(session))
+
+
+async def timed(samples: dict[str, list[float]], name: str, operation) -> object:
+    """Выполнить операцию в свежих сервисах и записать её время"""
+    started = time.perf_counter()
+    async with services() as (student_service, group_service):
+        result = await operation(student_service, group_service)
+    samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+    return result
+
+
+async def run(students: int, groups: int):
+    if settings.STORAGE_BACKEND == "postgres":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    samples: dict[str, list[float]] = {}
+    tag = uuid.uuid4().hex[:8]  # чтобы повторные запуски на БД не упирались в уникальность
+
+    group_ids = []
+    for i in range(groups):
+        group = await timed(samples, "create_group", lambda s, g: g.create_group(GroupCreate(name=f"bench-{tag}-{i}")))
+        group_ids.append(group.id)
+
+    student_ids = []
+    for i in range(students):
+        data = StudentCreate(first_name="Bench", last_name=f"Student{i}", email=f"bench-{tag}-{i}@example.com")
+        student = await timed(samples, "create_student", lambda s, g: s.create_student(data))
+        student_ids.append(student.id)
+
+    for i, student_id in enumerate(student_ids):
+        group_id = group_ids[i % groups]
+        await timed(samples, "add_student_to_group", lambda s, g: g.add_student_to_group(student_id, group_id))
+
+    for student_id in student_ids[:200]:
+        await timed(samples, "get_student", lambda s, g: s.get_student(student_id))
+    for group_id in group_ids:
+        await timed(samples, "get_group", lambda s, g: g.get_group(group_id))
+    for _ in range(5):
+        await timed(samples, "get_all_groups", lambda s, g: g.get_all_groups())
+        await timed(samples, "get_all_students", lambda s, g: s.get_all_students())
+
+    for i, student_id in enumerate(student_ids[:200]):
+        from_id, to_id = group_ids[i % groups], group_ids[(i + 1) % groups]
+        await timed(samples, "transfer_student", lambda s, g: g.transfer_student(student_id, from_id, to_id))
+
+    await timed(samples, "delete_students (bulk)", lambda s, g: s.delete_students(student_ids))
+    for group_id in group_ids:
+        await timed(samples, "delete_group", lambda s, g: g.delete_group(group_id))
+
+    print(f"Хранилище: {settings.STORAGE_BACKEND}, {students} студентов, {groups} групп")
+    print(f"{'операция':<24}{'вызовов':>9}{'p50, мс':>11}{'p95, мс':>11}{'макс, мс':>11}")
+    for name, values in samples.items():
+        values.sort()
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"{name:<24}{len(values):>9}{statistics.median(values):>11.3f}{p95:>11.3f}{values[-1]:>11.3f}")
+
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--groups", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.students, args.groups))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,49 @@
+import asyncio
 import uvicorn
-from fastapi import FastAPI, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from src.config import settings
-from src.database.database import engine, Base, get_async_session
-from src.models.models import Student, Group
-from src.api.routers import students, groups
+from src.database.database import engine, Base
+from src.database.health import prober
+from src.database.upgrade import upgrade_schema
+from src.database.warmup import warm_up
+from src.models.models import Student, Group, Tombstone
+from src.events.events import broker
+from src.services.membership_index import membership_index
+from src.api.encoding import EncodingMiddleware, NegotiatedResponse
+from src.tracing.tracing import TracingMiddleware, tracer
+from src.api.routers import students, groups, changes, sync, batch
 
 app = FastAPI(
     title="Students API",
     description="API для управления студентами и группами",
-    version="1.0.0.0"
+    version="1.0.0.0",
+    # JSON или MessagePack в зависимости от заголовка Accept
+    default_response_class=NegotiatedResponse
 )
 
+# Сжатие ответов gzip/brotli по Accept-Encoding
+app.add_middleware(EncodingMiddleware)
+
+# Корневой span трассировки на весь запрос (добавлен последним, поэтому внешний)
+app.add_middleware(TracingMiddleware)
+
+
+async def run_warmup():
+    """
+    Прогрев пула и подготовленных запросов
+    Пока он идёт, /readyz отвечает 503
+    """
+    connections = min(settings.DB_WARMUP_CONNECTIONS, settings.DB_POOL_SIZE)
+    try:
+        seconds = await warm_up(connections)
+        prober.warmup_seconds = seconds
+        print(f"Прогрев завершён: {connections} соединений за {seconds * 1000:.1f} мс")
+    except Exception as e:
+        # Без прогрева приложение работает, просто первые запросы будут медленнее
+        print(f"Прогрев не удался: {e}")
+    prober.warmed_up = True
+
 
 # Event handler для создания таблиц при старте приложения
 @app.on_event("startup")
@@ -21,15 +52,44 @@ async def startup():
     Выполняется при старте приложения
     Создаёт все таблицы в БД, если их нет
     """
+    # Индекс членства поддерживается событиями ленты
+    broker.add_handler(membership_index.apply)
+
+    if settings.STORAGE_BACKEND == "memory":
+        # Хранилище в памяти: БД, прогрева и LISTEN нет, события раздаются внутри процесса
+        await prober.probe()
+        prober.warmed_up = True
+        await membership_index.rebuild()
+        print("Используется хранилище в памяти")
+        return
+
     async with engine.begin() as conn:
         # Создаём все таблицы из моделей, наследующих Base
         await conn.run_sync(Base.metadata.create_all)
+        # Существующим таблицам - колонки и индексы, добавленные в модели позже
+        await upgrade_schema(conn)
     print("База данных инициализирована")
 
+    # Первая проверка БД сразу, дальше - в фоне с фиксированным интервалом
+    await prober.probe()
+    prober.start()
+
+    # Прогрев идёт в фоне, чтобы /livez отвечал сразу
+    app.state.warmup_task = asyncio.create_task(run_warmup())
+
+    # Индекс пересобирается при каждом подключении ленты изменений
+    broker.add_connection_hook(membership_index.on_feed_connection)
+
+    # Подписываемся на канал ленты изменений
+    broker.start()
+
 
 # Подключаем роутеры
 app.include_router(students.router, prefix="/api/v1", tags=["students"])
 app.include_router(groups.router, prefix="/api/v1", tags=["groups"])
+app.include_router(changes.router, prefix="/api/v1", tags=["changes"])
+app.include_router(sync.router, prefix="/api/v1", tags=["sync"])
+app.include_router(batch.router, prefix="/api/v1", tags=["batch"])
 
 
 @app.on_event("shutdown")
@@ -38,8 +98,15 @@ async def shutdown():
     Выполняется при остановке приложения
     Корректно закрываем соединение с БД
     """
+    warmup_task = getattr(app.state, "warmup_task", None)
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await prober.stop()
+    await broker.stop()
     await engine.dispose()
     print("Соединение с БД закрыто")
+    # Дописать накопленные трассы в файл
+    tracer.close()
 
 
 @app.get("/")
@@ -57,23 +124,37 @@ async def root():
 
 
 @app.get("/health")
-async def health_check(session: AsyncSession = Depends(get_async_session)):
+async def health_check():
     """
     Проверка здоровья приложения и подключения к БД
+    Берёт закешированный результат фоновой проверки, запросов к БД не делает
     """
-    try:
-        # Пробуем выполнить простой SQL запрос
-        result = await session.execute(text("SELECT 1"))
-        db_status = "connected" if result else "error"
-    except Exception as e:
-        db_status = f"error: {str(e)}"
-
     return {
         "status": "healthy",
-        "database": db_status
+        **{k: v for k, v in prober.status().items() if k != "status"},
     }
 
 
+@app.get("/livez")
+async def liveness():
+    """
+    Liveness-проба
+    Процесс жив и обрабатывает запросы, без обращения к БД
+    """
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness():
+    """
+    Readiness-проба
+    Отдаёт закешированный статус фоновой проверки БД,
+    503 если БД недоступна или проверка давно не выполнялась
+    """
+    status = prober.status()
+    return JSONResponse(status_code=200 if prober.is_ready else 503, content=status)
+
+
 if __name__ == "__main__":
     # Запуск сервера
     # host="0.0.0.0" - доступен извне
@@ -0,0 +1,176 @@
+"""
+Кодирование ответов API.
+Сжатие gzip/brotli по Accept-Encoding и MessagePack по Accept
+"""
+import gzip
+from contextvars import ContextVar
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен, без него остаётся gzip
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # без msgpack все ответы отдаются в JSON
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Формат ответа текущего запроса, выставляется EncodingMiddleware
+_wants_msgpack: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+
+def _parse_accept(value: str) -> dict[str, float]:
+    """
+    Разобрать заголовок Accept/Accept-Encoding в словарь {значение: q}
+    """
+    result = {}
+    for part in value.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, q_value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(q_value)
+                except ValueError:
+                    q = 0.0
+        result[token.strip().lower()] = q
+    return result
+
+
+def _choose_encoding(accept_encoding: str) -> str | None:
+    """Выбрать сжатие: brotli, если клиент и сервер его поддерживают, иначе gzip"""
+    accepted = _parse_accept(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _prefers_msgpack(accept: str) -> bool:
+    """Просит ли клиент MessagePack охотнее, чем JSON"""
+    if msgpack is None:
+        return False
+    accepted = _parse_accept(accept)
+    msgpack_q = max(accepted.get(MSGPACK_MEDIA_TYPE, 0), accepted.get("application/x-msgpack", 0))
+    return msgpack_q > 0 and msgpack_q >= accepted.get("application/json", 0)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Сжать тело ответа выбранным алгоритмом"""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    Ответ по умолчанию для всех эндпоинтов
+    Кодирует содержимое в MessagePack, если клиент прислал Accept: application/msgpack,
+    иначе работает как обычный JSONResponse
+    """
+
+    def render(self, content) -> bytes:
+        if _wants_msgpack.get():
+            # render вызывается до формирования заголовков, поэтому media_type ещё можно поменять
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return msgpack.packb(content)
+        return super().render(content)
+
+    def init_headers(self, headers=None) -> None:
+        super().init_headers(headers)
+        if msgpack is not None:
+            # Формат ответа зависит от Accept, кешам нужно это знать
+            MutableHeaders(raw=self.raw_headers).add_vary_header("Accept")
+
+
+def _passthrough(headers: Headers) -> bool:
+    """
+    Можно ли решить по заголовкам, что ответ не сжимается:
+    поток SSE, уже сжатый ответ или известная длина меньше порога
+    """
+    if headers.get("content-type", "").startswith("text/event-stream") or "content-encoding" in headers:
+        return True
+    content_length = headers.get("content-length")
+    return content_length is not None and content_length.isdigit() and int(content_length) < settings.COMPRESSION_MINIMUM_SIZE
+
+
+class EncodingMiddleware:
+    """
+    ASGI middleware для согласования формата и сжатия ответов
+
+    Сжимает только ответы, отданные целиком, не меньше COMPRESSION_MINIMUM_SIZE байт.
+    Потоковые ответы (SSE) пропускаются как есть, а их заголовки отправляются сразу,
+    чтобы клиент не ждал первого события или keepalive
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = _choose_encoding(headers.get("accept-encoding", ""))
+        token = _wants_msgpack.set(_prefers_msgpack(headers.get("accept", "")))
+        try:
+            if encoding is None:
+                await self.app(scope, receive, send)
+            else:
+                await self._compressed(scope, receive, send, encoding)
+        finally:
+            _wants_msgpack.reset(token)
+
+    async def _compressed(self, scope: Scope, receive: Receive, send: Send, encoding: str) -> None:
+        """Выполнить запрос и сжать ответ, если он подходит"""
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                if _passthrough(Headers(raw=message["headers"])):
+                    # Сжимать не будем, заголовки уходят сразу, не дожидаясь тела
+                    passthrough = True
+                    await send(message)
+                    return
+                # Заголовки придержим до первого куска тела
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            start_message["headers"] = list(start_message["headers"])
+            response_headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < settings.COMPRESSION_MINIMUM_SIZE
+                or "content-encoding" in response_headers
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            response_headers["Content-Encoding"] = encoding
+            response_headers["Content-Length"] = str(len(body))
+            response_headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
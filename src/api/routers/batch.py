@@ -0,0 +1,66 @@
+"""
+API Роутер для пакетного выполнения операций
+Несколько операций со студентами и группами одним запросом и одной транзакцией
+"""
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
+from src.database.database import get_async_session
+from src.events.events import ChangePublisher, LocalChangePublisher
+from src.repositories.repositories import StudentRepository, GroupRepository
+from src.repositories.memory import InMemoryStudentRepository, InMemoryGroupRepository, memory_storage
+from src.services.services import BatchService
+from src.schemas.schemas import BatchRequest, BatchResponse
+from src.tracing.tracing import TracedRoute, traced
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@asynccontextmanager
+async def _memory_transaction():
+    """Репозитории в памяти с откатом к снимку при ошибке"""
+    async with memory_storage.transaction():
+        yield InMemoryStudentRepository(memory_storage), InMemoryGroupRepository(memory_storage)
+
+
+@traced("dependency")
+async def get_batch_service(session: AsyncSession = Depends(get_async_session)) -> BatchService:
+    """
+    Dependency для получения сервиса пакетов
+    Все операции и события идут в транзакции сессии запроса,
+    которая фиксируется одним COMMIT или откатывается целиком
+    (при STORAGE_BACKEND=memory - хранилище в памяти)
+    """
+    if settings.STORAGE_BACKEND == "memory":
+        return BatchService(_memory_transaction, LocalChangePublisher())
+
+    @asynccontextmanager
+    async def database_transaction():
+        # Транзакцией управляет get_async_session, ошибка пакета откатит её
+        yield StudentRepository(session), GroupRepository(session)
+
+    return BatchService(database_transaction, ChangePublisher(session))
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def execute_batch(
+        batch: BatchRequest,
+        service: BatchService = Depends(get_batch_service)
+):
+    """
+    Выполнить пакет операций в одной транзакции
+
+    - **operations**: список операций, каждая с полем op:
+      create_student, delete_student, create_group, delete_group,
+      add_student_to_group, remove_student_from_group, transfer_student
+    - у create_student и create_group можно задать **ref**, а в следующих
+      операциях указать эту строку вместо ID
+
+    Если хотя бы одна операция не удалась, не применяется ни одна
+    """
+    try:
+        return await service.execute(batch.operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,87 @@
+"""
+API Роутер для ленты изменений
+Отдаёт события создания/удаления и изменения состава групп через SSE и WebSocket
+"""
+import asyncio
+
+from fastapi import APIRouter, Query, WebSocket
+from fastapi.responses import StreamingResponse
+from src.config import settings
+from src.events.events import broker
+from src.tracing.tracing import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+
+async def _sse_events(group_ids: set[int] | None):
+    """
+    Генератор сообщений SSE
+
+    Подписка создаётся при первой итерации, а не в эндпоинте:
+    если клиент отключится до начала ответа, генератор не запустится,
+    и finally с отпиской не выполнился бы
+    """
+    subscription = broker.subscribe(group_ids)
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(),
+                    timeout=settings.CHANGE_FEED_KEEPALIVE
+                )
+            except asyncio.TimeoutError:
+                # Комментарий SSE не даёт прокси закрыть простаивающее соединение
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event.type}\ndata: {event.model_dump_json()}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@router.get("/changes/stream")
+async def stream_changes(group_id: list[int] | None = Query(default=None)):
+    """
+    Лента изменений в формате Server-Sent Events
+
+    - **group_id**: ID групп для фильтрации (можно указать несколько).
+      Без параметра приходят все события
+    """
+    return StreamingResponse(
+        _sse_events(set(group_id) if group_id else None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/changes/ws")
+async def websocket_changes(websocket: WebSocket, group_id: list[int] | None = Query(default=None)):
+    """
+    Лента изменений через WebSocket
+
+    - **group_id**: ID групп для фильтрации (можно указать несколько).
+      Без параметра приходят все события
+    """
+    await websocket.accept()
+    subscription = broker.subscribe(set(group_id) if group_id else None)
+
+    async def send_events():
+        while True:
+            event = await subscription.queue.get()
+            await websocket.send_text(event.model_dump_json())
+
+    async def wait_disconnect():
+        # Входящие сообщения не используются, ждём только закрытия соединения
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Забираем результаты задач, чтобы ошибки отправки не попадали в лог как необработанные
+        await asyncio.gather(*tasks, return_exceptions=True)
+        broker.unsubscribe(subscription)
@@ -2,30 +2,41 @@
 API Роутер для работы с группами
 Обрабатывает HTTP запросы, связанные с группами и операциями со студентами
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
 from src.database.database import get_async_session
+from src.events.events import ChangePublisher, LocalChangePublisher
 from src.repositories.repositories import GroupRepository
+from src.repositories.memory import InMemoryGroupRepository, memory_storage
 from src.services.services import GroupService
+from src.services.membership_index import membership_index
 from src.schemas.schemas import (
     GroupCreate,
     GroupResponse,
     GroupWithStudents,
     AddStudentToGroup,
     TransferStudent,
-    StudentResponse
+    StudentResponse,
+    GroupQueryResult,
+    GroupSort
 )
+from src.tracing.tracing import TracedRoute, traced
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
+@traced("dependency")
 async def get_group_service(session: AsyncSession = Depends(get_async_session)) -> GroupService:
     """
     Dependency для получения сервиса групп
-    Создаёт репозиторий и сервис с текущей сессией БД
+    Создаёт репозиторий, публикатор событий и сервис с текущей сессией БД
+    (или с хранилищем в памяти при STORAGE_BACKEND=memory)
     """
+    if settings.STORAGE_BACKEND == "memory":
+        return GroupService(InMemoryGroupRepository(memory_storage), LocalChangePublisher())
     repository = GroupRepository(session)
-    return GroupService(repository)
+    return GroupService(repository, ChangePublisher(session))
 
 
 @router.post("/groups", response_model=GroupResponse, status_code=201)
@@ -46,6 +57,38 @@ async def create_group(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/groups/query", response_model=GroupQueryResult)
+async def query_groups(
+        all: list[int] = Query(default=[]),
+        any: list[int] = Query(default=[]),
+        none: list[int] = Query(default=[]),
+        offset: int = Query(default=0, ge=0, le=10_000_000),
+        limit: int = Query(default=100, ge=1, le=10000)
+):
+    """
+    Найти студентов по составу групп
+
+    - **all**: студент состоит во всех этих группах
+    - **any**: студент состоит хотя бы в одной из этих групп
+    - **none**: студент не состоит ни в одной из этих групп
+
+    Параметры повторяются: ?all=1&all=2&none=3.
+    Отвечает из индекса в памяти, без запросов к БД
+    """
+    try:
+        result = membership_index.query(all, any, none)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "count": membership_index.count(result),
+        "offset": offset,
+        "limit": limit,
+        "student_ids": membership_index.page(result, offset, limit),
+    }
+
+
 @router.get("/groups/{group_id}", response_model=GroupWithStudents)
 async def get_group(
         group_id: int,
@@ -65,15 +108,25 @@ async def get_group(
 
 @router.get("/groups", response_model=list[GroupWithStudents])
 async def get_all_groups(
+        name_prefix: str | None = None,
+        min_size: int | None = Query(default=None, ge=0),
+        sort: GroupSort = "id",
         service: GroupService = Depends(get_group_service)
 ):
     """
-    Получить список всех групп
+    Получить список групп
+
+    - **name_prefix**: только группы, название которых начинается с префикса (например, CS-)
+    - **min_size**: только группы, в которых не меньше min_size студентов
+    - **sort**: id или name, с "-" - по убыванию
 
-    Возвращает все группы со списками студентов
+    Возвращает группы со списками студентов
     """
-    groups = await service.get_all_groups()
-    return groups
+    try:
+        groups = await service.get_all_groups(name_prefix, min_size, sort)
+        return groups
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/groups/{group_id}")
@@ -2,23 +2,31 @@
 API Роутер для работы со студентами
 Обрабатывает HTTP запросы, связанные со студентами
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
 from src.database.database import get_async_session
+from src.events.events import ChangePublisher, LocalChangePublisher
 from src.repositories.repositories import StudentRepository
+from src.repositories.memory import InMemoryStudentRepository, memory_storage
 from src.services.services import StudentService
-from src.schemas.schemas import StudentCreate, StudentResponse, StudentWithGroups
+from src.schemas.schemas import StudentCreate, StudentResponse, StudentWithGroups, StudentSort
+from src.tracing.tracing import TracedRoute, traced
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
+@traced("dependency")
 async def get_student_service(session: AsyncSession = Depends(get_async_session)) -> StudentService:
     """
     Dependency для получения сервиса студентов
-    Создаёт репозиторий и сервис с текущей сессией БД
+    Создаёт репозиторий, публикатор событий и сервис с текущей сессией БД
+    (или с хранилищем в памяти при STORAGE_BACKEND=memory)
     """
+    if settings.STORAGE_BACKEND == "memory":
+        return StudentService(InMemoryStudentRepository(memory_storage), LocalChangePublisher())
     repository = StudentRepository(session)
-    return StudentService(repository)
+    return StudentService(repository, ChangePublisher(session))
 
 
 @router.post("/students", response_model=StudentResponse, status_code=201)
@@ -59,15 +67,27 @@ async def get_student(
 
 @router.get("/students", response_model=list[StudentWithGroups])
 async def get_all_students(
+        group_id: int | None = None,
+        last_name: str | None = None,
+        email_domain: str | None = None,
+        sort: StudentSort = "id",
         service: StudentService = Depends(get_student_service)
 ):
     """
-    Получить список всех студентов
+    Получить список студентов
 
-    Возвращает всех студентов с их группами
+    - **group_id**: только студенты этой группы
+    - **last_name**: только студенты с этой фамилией
+    - **email_domain**: только студенты с email в этом домене (например, example.com)
+    - **sort**: id, last_name или email, с "-" - по убыванию
+
+    Возвращает студентов с их группами
     """
-    students = await service.get_all_students()
-    return students
+    try:
+        students = await service.get_all_students(group_id, last_name, email_domain, sort)
+        return students
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/students/{student_id}")
@@ -84,4 +104,23 @@ async def delete_student(
         result = await service.delete_student(student_id)
         return result
     except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.delete("/students")
+async def delete_students(
+        ids: list[int] = Query(..., min_length=1, max_length=1000),
+        service: StudentService = Depends(get_student_service)
+):
+    """
+    Удалить нескольких студентов одним запросом
+
+    - **ids**: ID студентов (параметр повторяется: ?ids=1&ids=2)
+
+    Возвращает списки удалённых и не найденных ID
+    """
+    try:
+        result = await service.delete_students(ids)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
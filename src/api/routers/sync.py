@@ -0,0 +1,51 @@
+"""
+API Роутер для инкрементальной синхронизации
+Отдаёт только изменения после переданного watermark
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
+from src.database.database import get_async_session
+from src.repositories.repositories import SyncRepository
+from src.repositories.memory import InMemorySyncRepository, memory_storage
+from src.services.services import SyncService
+from src.schemas.schemas import SyncResponse
+from src.tracing.tracing import TracedRoute, traced
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@traced("dependency")
+async def get_sync_service(session: AsyncSession = Depends(get_async_session)) -> SyncService:
+    """
+    Dependency для получения сервиса синхронизации
+    Создаёт репозиторий и сервис с текущей сессией БД
+    (или с хранилищем в памяти при STORAGE_BACKEND=memory)
+    """
+    if settings.STORAGE_BACKEND == "memory":
+        return SyncService(InMemorySyncRepository(memory_storage))
+    repository = SyncRepository(session)
+    return SyncService(repository)
+
+
+@router.get("/sync", response_model=SyncResponse)
+async def sync_changes(
+        since: str | None = None,
+        limit: int = Query(default=1000, ge=1, le=10000),
+        service: SyncService = Depends(get_sync_service)
+):
+    """
+    Получить изменения после watermark
+
+    - **since**: watermark из предыдущего ответа (без него - полная выгрузка)
+    - **limit**: максимум записей в каждом потоке на странице
+
+    Пока has_more = true, повторяйте запрос с новым watermark.
+    Удаления приходят в tombstones: удаление студента или группы
+    означает и удаление всех их связей. Запись об удалении применяйте,
+    только если её deleted_at позже updated_at известной клиенту записи
+    """
+    try:
+        return await service.get_changes(since, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -2,6 +2,7 @@
 Конфигурация приложения.
 Загружает переменные окружения из .env файла
 """
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 
@@ -17,6 +18,58 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
 
+    # Хранилище данных: postgres или memory (в памяти процесса, для тестов и бенчмарков)
+    STORAGE_BACKEND: Literal["postgres", "memory"] = "postgres"
+
+    # Хеш-секционирование student_group_association (только при создании таблицы)
+    # Число секций, 0 - без секционирования
+    MEMBERSHIP_PARTITIONS: int = 0
+    # Ключ секционирования: запросы с равенством по нему читают одну секцию
+    MEMBERSHIP_PARTITION_KEY: Literal["group_id", "student_id"] = "group_id"
+
+    # Параметры пула соединений
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Сколько соединений открыть и прогреть при старте (не больше DB_POOL_SIZE)
+    DB_WARMUP_CONNECTIONS: int = 5
+
+    # Фоновая проверка БД для /readyz
+    # Интервал между проверками (секунды)
+    HEALTH_PROBE_INTERVAL: float = 5.0
+    # Таймаут одной проверки (секунды)
+    HEALTH_PROBE_TIMEOUT: float = 2.0
+
+    # Лента изменений (LISTEN/NOTIFY)
+    # Канал PostgreSQL для событий
+    CHANGE_FEED_CHANNEL: str = "changes"
+    # Размер очереди одного подписчика, при переполнении старые события отбрасываются
+    CHANGE_FEED_QUEUE_SIZE: int = 256
+    # Интервал keepalive-сообщений для SSE (секунды)
+    CHANGE_FEED_KEEPALIVE: float = 15.0
+
+    # Инкрементальная синхронизация (GET /sync)
+    # Изменения моложе этого значения (секунды) откладываются до следующего запроса.
+    # Кроме того, выдача не заходит дальше начала самой старой открытой транзакции,
+    # чтобы её строки с более ранним now() не оказались позади watermark
+    SYNC_SAFETY_LAG: float = 1.0
+
+    # Сжатие ответов
+    # Ответы меньше этого размера (байты) не сжимаются
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    # Качество brotli 0-11, высокие значения слишком медленные для динамических ответов
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Трассировка запросов
+    # Куда выгружать span: none (выключено), file или memory
+    TRACING_EXPORTER: Literal["none", "file", "memory"] = "none"
+    # Доля записываемых запросов, 0.0-1.0
+    TRACING_SAMPLE_RATE: float = 1.0
+    # Файл для TRACING_EXPORTER=file (формат Chrome Trace Event, открывается в Perfetto)
+    TRACING_FILE: str = "traces.json"
+    # Сколько последних событий хранить при TRACING_EXPORTER=memory
+    TRACING_MEMORY_EVENTS: int = 10000
+
     @property
     def DATABASE_URL(self) -> str:
         """
@@ -1,16 +1,24 @@
 """
 Настройка подключения к базе данных.
 """
+from contextlib import asynccontextmanager
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from src.config import settings
+from src.tracing.tracing import instrument_engine
 
 # Создаём асинхронный движок для работы с БД
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
 )
 
+# Span на каждый SQL-запрос (пишутся, только если запрос трассируется)
+instrument_engine(engine)
+
 # Фабрика для создания асинхронных сессий
 async_session_maker = async_sessionmaker(
     engine,
@@ -33,6 +41,38 @@ async def get_async_session():
     """
     Генератор для получения асинхронной сессии БД.
     Используется как зависимость в FastAPI эндпоинтах.
+
+    Весь запрос идёт в одной транзакции (см. transaction_session): события ленты
+    отправляются в ней же и фиксируются вместе с данными одним COMMIT
+    """
+    if settings.STORAGE_BACKEND == "memory":
+        # Хранилище в памяти сессией не пользуется, соединение не открывается
+        async with async_session_maker() as session:
+            yield session
+        return
+    async with transaction_session() as session:
+        yield session
+
+
+@asynccontextmanager
+async def transaction_session():
+    """
+    Сессия, все операции которой идут в одной транзакции
+
+    В режиме rollback_only commit в репозиториях только сбрасывает изменения в БД,
+    не фиксируя транзакцию, а rollback откатывает её целиком.
+    Транзакция фиксируется при выходе из блока и откатывается при исключении
     """
-    async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, join_transaction_mode="rollback_only", expire_on_commit=False)
+        try:
+            yield session
+            await session.flush()
+        except BaseException:
+            await session.close()
+            if transaction.is_active:
+                await transaction.rollback()
+            raise
+        await session.close()
+        await transaction.commit()
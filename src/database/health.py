@@ -0,0 +1,169 @@
+"""
+Фоновая проверка состояния БД.
+Периодически выполняет SELECT 1 и кеширует результат,
+чтобы /readyz отвечал мгновенно и не занимал соединения из пула
+"""
+import asyncio
+import logging
+import time
+
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncEngine
+from src.config import settings
+from src.database.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseProber:
+    """
+    Фоновый проверяльщик БД
+
+    Раз в interval секунд выполняет SELECT 1 и запоминает результат,
+    время ответа и загрузку пула engine.
+    Проверка идёт по своему соединению asyncpg вне пула SQLAlchemy
+    (как LISTEN у ChangeBroker): под нагрузкой она не ждёт свободного
+    соединения и не отнимает его у запросов, а полный пул - только метрика.
+    Без engine (хранилище в памяти) проверка всегда успешна
+    """
+
+    def __init__(self, engine: AsyncEngine | None, interval: float, timeout: float, pool_capacity: int):
+        self.engine = engine
+        self.interval = interval
+        self.timeout = timeout
+        self.pool_capacity = pool_capacity
+
+        self.database_ok = False
+        self.last_error: str | None = None
+        self.last_check: float | None = None  # time.monotonic() последней проверки
+        self.round_trip_ms: float | None = None
+        self.pool_checked_out = 0
+
+        # Пока прогрев не завершён, приложение не готово принимать трафик
+        self.warmed_up = False
+        self.warmup_seconds: float | None = None
+
+        self._task: asyncio.Task | None = None
+        self._connection: asyncpg.Connection | None = None
+
+    async def _connect(self) -> asyncpg.Connection:
+        """Открыть выделенное соединение для проверок"""
+        return await asyncpg.connect(
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            database=settings.POSTGRES_DB,
+        )
+
+    async def _close_connection(self) -> None:
+        """Закрыть выделенное соединение, если оно есть"""
+        connection, self._connection = self._connection, None
+        if connection is not None and not connection.is_closed():
+            try:
+                await connection.close(timeout=self.timeout)
+            except Exception:
+                connection.terminate()
+
+    async def probe(self) -> None:
+        """Выполнить одну проверку и обновить кешированный статус"""
+        if self.engine is None:
+            self.database_ok = True
+            self.last_check = time.monotonic()
+            return
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                if self._connection is None or self._connection.is_closed():
+                    self._connection = await self._connect()
+                await self._connection.fetchval("SELECT 1")
+            self.database_ok = True
+            self.last_error = None
+            self.round_trip_ms = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            self.database_ok = False
+            self.last_error = str(e) or type(e).__name__
+            self.round_trip_ms = None
+            # Соединение могло оборваться или застрять, следующая проверка откроет новое
+            await self._close_connection()
+        self.last_check = time.monotonic()
+        self.pool_checked_out = self.engine.pool.checkedout()
+
+    async def _run(self) -> None:
+        """Бесконечный цикл проверок"""
+        while True:
+            try:
+                await self.probe()
+            except Exception:
+                logger.exception("Ошибка фоновой проверки БД")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Запустить фоновую задачу"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить фоновую задачу и закрыть соединение проверок"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_connection()
+
+    @property
+    def is_stale(self) -> bool:
+        """
+        Результат устарел, если проверка не выполнялась дольше трёх интервалов
+
+        Хранилище в памяти не может стать недоступным, его результат не устаревает
+        """
+        if self.last_check is None:
+            return True
+        if self.engine is None:
+            return False
+        return time.monotonic() - self.last_check > 3 * self.interval + self.timeout
+
+    @property
+    def is_ready(self) -> bool:
+        """Готово ли приложение принимать трафик"""
+        return self.warmed_up and self.database_ok and not self.is_stale
+
+    def status(self) -> dict:
+        """Кешированный статус для ответа эндпоинта"""
+        if self.last_check is None:
+            database = "not checked"
+        elif self.engine is None:
+            database = "in-memory"
+        elif self.database_ok:
+            database = "connected"
+        else:
+            database = f"error: {self.last_error}"
+        age = None if self.last_check is None else round(time.monotonic() - self.last_check, 3)
+        return {
+            "status": "ready" if self.is_ready else "not ready",
+            "database": database,
+            "checked_seconds_ago": age,
+            "warmup": {
+                "done": self.warmed_up,
+                "seconds": None if self.warmup_seconds is None else round(self.warmup_seconds, 3),
+            },
+            "round_trip_ms": None if self.round_trip_ms is None else round(self.round_trip_ms, 3),
+            "pool": {
+                "checked_out": self.pool_checked_out,
+                "capacity": self.pool_capacity,
+                "saturation": round(self.pool_checked_out / self.pool_capacity, 3) if self.pool_capacity else None,
+            },
+        }
+
+
+# Один проверяльщик на процесс
+prober = DatabaseProber(
+    engine if settings.STORAGE_BACKEND == "postgres" else None,
+    interval=settings.HEALTH_PROBE_INTERVAL,
+    timeout=settings.HEALTH_PROBE_TIMEOUT,
+    pool_capacity=settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+)
@@ -0,0 +1,69 @@
+"""
+Обновление схемы существующей БД.
+create_all создаёт только недостающие таблицы и не меняет существующие,
+поэтому колонки и индексы, добавленные в модели позже, докатываются здесь
+идемпотентными ALTER TABLE ... ADD COLUMN IF NOT EXISTS и CREATE INDEX IF NOT EXISTS
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import CreateIndex
+from src.database.database import Base
+
+# Ключ advisory-блокировки: воркеры, стартующие одновременно, обновляют схему по очереди
+_UPGRADE_LOCK_KEY = 7_203_114
+
+# Колонки, добавленные в уже существующие таблицы.
+# now() стабильна в пределах транзакции, поэтому PostgreSQL 11+ добавляет
+# колонку без перезаписи таблицы, а старые строки получают время обновления схемы
+ADDED_COLUMNS = [
+    # GET /sync: время создания и изменения записей
+    "ALTER TABLE students ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()",
+    "ALTER TABLE students ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()",
+    "ALTER TABLE groups ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()",
+    "ALTER TABLE groups ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()",
+    "ALTER TABLE student_group_association "
+    "ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()",
+    "ALTER TABLE student_group_association "
+    "ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()",
+]
+
+# Индексы моделей на уже существующих таблицах (DDL берётся из моделей)
+ADDED_INDEXES = [
+    # GET /sync: выборка по (updated_at, ключ)
+    "ix_students_updated_at_id",
+    "ix_groups_updated_at_id",
+    "ix_student_group_association_updated_at",
+    # Фильтры и сортировки GET /students и GET /groups
+    "ix_students_last_name_first_name_id",
+    "ix_students_email_domain",
+    "ix_groups_name_prefix",
+    "ix_student_group_association_group_id",
+]
+
+
+def _model_index(name: str):
+    """Индекс модели по имени"""
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise LookupError(f"Индекс {name} не описан в моделях")
+
+
+async def upgrade_schema(conn: AsyncConnection) -> None:
+    """
+    Довести схему существующей БД до моделей
+
+    Выполняется при старте после create_all в той же транзакции.
+    На свежей БД все объекты уже есть и команды ничего не делают.
+    CREATE INDEX блокирует запись в таблицу на время построения: на больших
+    таблицах индексы лучше заранее создать вручную с CONCURRENTLY (см. README)
+
+    Args:
+        conn: Соединение с открытой транзакцией
+    """
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _UPGRADE_LOCK_KEY})
+    for statement in ADDED_COLUMNS:
+        await conn.execute(text(statement))
+    for name in ADDED_INDEXES:
+        await conn.execute(CreateIndex(_model_index(name), if_not_exists=True))
@@ -0,0 +1,55 @@
+"""
+Прогрев приложения при старте.
+Заранее открывает соединения пула и подготавливает на каждом из них
+запросы репозиториев, чтобы первые запросы после деплоя не платили за это
+"""
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from src.database.database import engine
+from src.repositories.repositories import StudentRepository, GroupRepository, SyncRepository
+
+
+async def _prime_connection(connection: AsyncConnection) -> None:
+    """
+    Выполнить все запросы репозиториев на соединении
+
+    Всё происходит в транзакции, которая откатывается, а commit внутри
+    репозиториев фиксирует только точки сохранения
+    """
+    transaction = await connection.begin()
+    session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False)
+    try:
+        await StudentRepository(session).warmup()
+        await GroupRepository(session).warmup()
+        await SyncRepository(session).warmup()
+    finally:
+        await session.close()
+        await transaction.rollback()
+
+
+async def warm_up(connections: int) -> float:
+    """
+    Открыть connections соединений одновременно и прогреть каждое
+
+    Соединения возвращаются в пул и остаются в нём открытыми
+
+    Args:
+        connections: Сколько соединений открыть
+
+    Returns:
+        Длительность прогрева в секундах
+    """
+    started = time.perf_counter()
+    opened = await asyncio.gather(*(engine.connect() for _ in range(connections)), return_exceptions=True)
+    try:
+        errors = [result for result in opened if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        await asyncio.gather(*(_prime_connection(connection) for connection in opened))
+    finally:
+        for connection in opened:
+            if isinstance(connection, AsyncConnection):
+                await connection.close()
+    return time.perf_counter() - started
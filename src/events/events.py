@@ -0,0 +1,224 @@
+"""
+Лента изменений.
+Сервисы публикуют события через pg_notify, каждый воркер слушает канал
+на одном выделенном соединении и раздаёт события своим подписчикам
+"""
+import asyncio
+import logging
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import text, bindparam, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
+from src.schemas.schemas import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+
+_NOTIFY_MANY = text(
+    "SELECT pg_notify(:channel, payload) FROM unnest(:payloads) AS payload"
+).bindparams(bindparam("payloads", type_=ARRAY(Text)))
+
+
+class ChangePublisher:
+    """Публикация событий в канал PostgreSQL в рамках сессии запроса"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def publish(self, *events: ChangeEvent) -> None:
+        """
+        Опубликовать события
+
+        NOTIFY выполняется в транзакции запроса (см. get_async_session)
+        и доставляется слушателям только после её commit, вместе с данными.
+        Ошибка публикации откатывает и саму операцию, поэтому событие
+        не теряется при зафиксированных данных
+
+        Args:
+            events: События для отправки
+        """
+        if not events:
+            return
+        # Все события уходят одним запросом, даже при массовых операциях
+        await self.session.execute(
+            _NOTIFY_MANY,
+            {
+                "channel": settings.CHANGE_FEED_CHANNEL,
+                "payloads": [event.model_dump_json() for event in events]
+            }
+        )
+
+
+class LocalChangePublisher:
+    """
+    Публикация событий без PostgreSQL, сразу подписчикам этого процесса
+    Используется с хранилищем в памяти
+    """
+
+    async def publish(self, *events: ChangeEvent) -> None:
+        """Раздать события через брокер процесса"""
+        for event in events:
+            broker.dispatch(event)
+
+
+class BufferedPublisher:
+    """
+    Накопление событий без отправки
+    Используется в пакете операций: события уходят одним запросом после последней операции
+    """
+
+    def __init__(self):
+        self.events: list[ChangeEvent] = []
+
+    async def publish(self, *events: ChangeEvent) -> None:
+        """Отложить события"""
+        self.events.extend(events)
+
+
+class Subscription:
+    """
+    Подписка на ленту изменений
+
+    Если group_ids задан, подписчик получает только события этих групп
+    """
+
+    def __init__(self, group_ids: set[int] | None, queue_size: int):
+        self.group_ids = group_ids
+        self.queue: asyncio.Queue[ChangeEvent] = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0  # Сколько событий отброшено из-за медленного клиента
+
+    def matches(self, event: ChangeEvent) -> bool:
+        """Подходит ли событие под фильтр подписчика"""
+        if self.group_ids is None:
+            return True
+        return not self.group_ids.isdisjoint(event.group_ids)
+
+    def push(self, event: ChangeEvent) -> None:
+        """Положить событие в очередь, при переполнении вытеснить самое старое"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class ChangeBroker:
+    """
+    Раздача событий подписчикам внутри воркера
+
+    Держит одно выделенное соединение asyncpg вне пула SQLAlchemy
+    и переподключается при его потере
+    """
+
+    def __init__(self, channel: str, queue_size: int, reconnect_delay: float = 1.0):
+        self.channel = channel
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+
+        self._subscriptions: set[Subscription] = set()
+        self._handlers: list[Callable[[ChangeEvent], None]] = []
+        self._connection_hooks: list[Callable[[bool], None]] = []
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, group_ids: set[int] | None = None) -> Subscription:
+        """Создать подписку (group_ids=None - все события)"""
+        subscription = Subscription(group_ids, self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Удалить подписку"""
+        self._subscriptions.discard(subscription)
+
+    def add_handler(self, handler: Callable[[ChangeEvent], None]) -> None:
+        """Зарегистрировать обработчик, вызываемый для каждого события"""
+        self._handlers.append(handler)
+
+    def add_connection_hook(self, hook: Callable[[bool], None]) -> None:
+        """
+        Зарегистрировать колбэк на подключение (True) и потерю (False) соединения LISTEN
+
+        Пока соединения нет, события теряются, поэтому потребителям
+        с собственным состоянием стоит пересобрать его после подключения
+        """
+        self._connection_hooks.append(hook)
+
+    def _notify_connection(self, connected: bool) -> None:
+        """Вызвать колбэки подключения"""
+        for hook in self._connection_hooks:
+            try:
+                hook(connected)
+            except Exception:
+                logger.exception("Ошибка колбэка подключения ленты изменений")
+
+    def dispatch(self, event: ChangeEvent) -> None:
+        """Раздать событие обработчикам и подходящим подписчикам"""
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Ошибка обработчика события %s", event.type)
+        for subscription in self._subscriptions:
+            if subscription.matches(event):
+                subscription.push(event)
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        """Колбэк asyncpg на NOTIFY"""
+        try:
+            event = ChangeEvent.model_validate_json(payload)
+        except ValueError:
+            logger.warning("Некорректное событие в канале %s: %s", channel, payload)
+            return
+        self.dispatch(event)
+
+    async def _listen(self) -> None:
+        """Слушать канал, переподключаясь при обрыве соединения"""
+        while True:
+            try:
+                connection = await asyncpg.connect(
+                    user=settings.POSTGRES_USER,
+                    password=settings.POSTGRES_PASSWORD,
+                    host=settings.POSTGRES_HOST,
+                    port=settings.POSTGRES_PORT,
+                    database=settings.POSTGRES_DB,
+                )
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("Лента изменений: не удалось подключиться к БД: %s", e)
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            try:
+                await connection.add_listener(self.channel, self._on_notify)
+                self._notify_connection(True)
+                await lost.wait()
+                logger.warning("Лента изменений: соединение потеряно, переподключение")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("Лента изменений: ошибка соединения: %s", e)
+            finally:
+                self._notify_connection(False)
+                if not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def start(self) -> None:
+        """Запустить фоновое прослушивание канала"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Остановить прослушивание"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Один брокер (и одно соединение LISTEN) на воркер
+broker = ChangeBroker(settings.CHANGE_FEED_CHANNEL, settings.CHANGE_FEED_QUEUE_SIZE)
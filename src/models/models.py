@@ -2,10 +2,20 @@
 ORM модели для базы данных.
 Описывают структуру таблиц Student, Group и их связи
 """
-from sqlalchemy import String, ForeignKey, Table, Column, Integer
+from datetime import datetime
+from sqlalchemy import String, ForeignKey, Table, Column, Integer, DateTime, Index, DDL, event, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from src.config import settings
 from src.database.database import Base
 
+
+def _partitioning() -> dict:
+    """Параметры хеш-секционирования таблицы связей (пусто, если оно выключено)"""
+    if settings.MEMBERSHIP_PARTITIONS <= 0:
+        return {}
+    return {"postgresql_partition_by": f"HASH ({settings.MEMBERSHIP_PARTITION_KEY})"}
+
+
 # Эта таблица связывает студентов и группы
 # Один студент может быть в нескольких группах
 # Одна группа может содержать нескольких студентов
@@ -13,9 +23,29 @@ student_group_association = Table(
     "student_group_association",  # Имя таблицы в БД
     Base.metadata,
     Column("student_id", Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True),
-    Column("group_id", Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    Column("group_id", Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True),
+    # Время создания и изменения связи (для инкрементальной синхронизации)
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False),
+    Index("ix_student_group_association_updated_at", "updated_at", "student_id", "group_id"),
+    # Первичный ключ начинается со student_id, для выборок и каскадов по группе нужен обратный индекс
+    Index("ix_student_group_association_group_id", "group_id", "student_id"),
+    # Ключ секционирования входит в первичный ключ, поэтому уникальность и ON CONFLICT работают
+    **_partitioning(),
 )
 
+# Секции создаются сразу после родительской таблицы, индексы PostgreSQL создаёт в них сам
+for _remainder in range(max(settings.MEMBERSHIP_PARTITIONS, 0)):
+    event.listen(
+        student_group_association,
+        "after_create",
+        DDL(
+            f"CREATE TABLE student_group_association_p{_remainder} "
+            f"PARTITION OF student_group_association "
+            f"FOR VALUES WITH (MODULUS {settings.MEMBERSHIP_PARTITIONS}, REMAINDER {_remainder})"
+        ).execute_if(dialect="postgresql")
+    )
+
 
 class Student(Base):
     """
@@ -23,6 +53,13 @@ class Student(Base):
     Таблица: students
     """
     __tablename__ = "students"
+    __table_args__ = (
+        Index("ix_students_updated_at_id", "updated_at", "id"),
+        # Сортировка GET /students?sort=last_name и фильтр по фамилии
+        Index("ix_students_last_name_first_name_id", "last_name", "first_name", "id"),
+        # Фильтр GET /students?email_domain=
+        Index("ix_students_email_domain", text("lower(split_part(email, '@', 2))")),
+    )
 
     # Первичный ключ
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -36,11 +73,19 @@ class Student(Base):
     # Email студента (обязательное, уникальное поле, макс 200 символов)
     email: Mapped[str] = mapped_column(String(200), unique=True)
 
+    # Время создания и последнего изменения записи
+    # По (updated_at, id) работает GET /sync
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
     # Связь многие-ко-многим с группами
     # back_populates - создаёт двустороннюю связь
     groups: Mapped[list["Group"]] = relationship(
         secondary=student_group_association,  # Через промежуточную таблицу
-        back_populates="students"  # Обратная связь в модели Group
+        back_populates="students",  # Обратная связь в модели Group
+        passive_deletes=True  # Связи при удалении удаляет БД (ON DELETE CASCADE)
     )
 
     def __repr__(self):
@@ -54,6 +99,11 @@ class Group(Base):
     Таблица: groups
     """
     __tablename__ = "groups"
+    __table_args__ = (
+        Index("ix_groups_updated_at_id", "updated_at", "id"),
+        # Фильтр по префиксу GET /groups?name_prefix= (LIKE 'CS-%' не использует обычный индекс)
+        Index("ix_groups_name_prefix", "name", postgresql_ops={"name": "varchar_pattern_ops"}),
+    )
 
     # Первичный ключ
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -64,12 +114,50 @@ class Group(Base):
     # Описание группы (необязательное поле, макс 500 символов)
     description: Mapped[str | None] = mapped_column(String(500), nullable=True)
 
+    # Время создания и последнего изменения записи
+    # По (updated_at, id) работает GET /sync
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
     # Связь многие-ко-многим со студентами
     students: Mapped[list["Student"]] = relationship(
         secondary=student_group_association,
-        back_populates="groups"
+        back_populates="groups",
+        passive_deletes=True
     )
 
     def __repr__(self):
         """Строковое представление объекта"""
-        return f"<Group(id={self.id}, name={self.name})>"
\ No newline at end of file
+        return f"<Group(id={self.id}, name={self.name})>"
+
+
+class Tombstone(Base):
+    """
+    Запись об удалении ("надгробие")
+    Таблица: tombstones
+
+    Остаётся после удаления студента, группы или связи,
+    чтобы GET /sync мог сообщить клиентам об удалении
+    """
+    __tablename__ = "tombstones"
+    __table_args__ = (Index("ix_tombstones_deleted_at_id", "deleted_at", "id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    # Что удалено: "student", "group" или "membership"
+    entity: Mapped[str] = mapped_column(String(20))
+
+    # ID студента или группы (для membership - ID студента)
+    entity_id: Mapped[int] = mapped_column(Integer)
+
+    # ID группы (только для membership)
+    group_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # Время удаления
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        """Строковое представление объекта"""
+        return f"<Tombstone(entity={self.entity}, entity_id={self.entity_id}, group_id={self.group_id})>"
@@ -0,0 +1,352 @@
+"""
+Repository Layer - хранилище в памяти процесса
+Тот же интерфейс, что у репозиториев PostgreSQL, для тестов и бенчмарков без БД.
+Включается настройкой STORAGE_BACKEND=memory
+"""
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from src.tracing.tracing import traced_methods
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Ключи сортировки, совпадающие с STUDENT_SORT_COLUMNS и GROUP_SORT_COLUMNS репозиториев БД
+STUDENT_SORT_KEYS = {
+    "id": lambda student: student.id,
+    "last_name": lambda student: (student.last_name, student.first_name, student.id),
+    "email": lambda student: student.email,
+}
+GROUP_SORT_KEYS = {
+    "id": lambda group: group.id,
+    "name": lambda group: group.name,
+}
+
+
+def _sorted(records: list, sort: str, keys: dict) -> list:
+    """
+    Отсортировать записи по сортировке вида "name" или "-name"
+
+    Raises:
+        ValueError: Если сортировка не из разрешённого списка
+    """
+    key = sort.lstrip("-")
+    if key not in keys:
+        raise ValueError(f"Сортировка {sort} не поддерживается")
+    return sorted(records, key=keys[key], reverse=sort.startswith("-"))
+
+
+@dataclass
+class StudentRecord:
+    """Студент в памяти, атрибуты совпадают с моделью Student"""
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+    created_at: datetime
+    updated_at: datetime
+    storage: "MemoryStorage" = field(repr=False, compare=False)
+
+    @property
+    def groups(self) -> list["GroupRecord"]:
+        """Группы студента (по вторичному индексу student_groups)"""
+        return [self.storage.groups[group_id] for group_id in sorted(self.storage.student_groups[self.id])]
+
+
+@dataclass
+class GroupRecord:
+    """Группа в памяти, атрибуты совпадают с моделью Group"""
+    id: int
+    name: str
+    description: str | None
+    created_at: datetime
+    updated_at: datetime
+    storage: "MemoryStorage" = field(repr=False, compare=False)
+
+    @property
+    def students(self) -> list[StudentRecord]:
+        """Студенты группы (по вторичному индексу group_students)"""
+        return [self.storage.students[student_id] for student_id in sorted(self.storage.group_students[self.id])]
+
+
+@dataclass
+class MembershipRecord:
+    """Связь студент-группа"""
+    student_id: int
+    group_id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+@dataclass
+class TombstoneRecord:
+    """Запись об удалении, атрибуты совпадают с моделью Tombstone"""
+    id: int
+    entity: str
+    entity_id: int
+    group_id: int | None
+    deleted_at: datetime
+
+
+class MemoryStorage:
+    """
+    Данные всех репозиториев в памяти
+
+    Помимо основных словарей держит вторичные индексы:
+    email -> ID для уникальности и членство в обе стороны
+    """
+
+    def __init__(self):
+        self.students: dict[int, StudentRecord] = {}
+        self.groups: dict[int, GroupRecord] = {}
+        self.memberships: dict[tuple[int, int], MembershipRecord] = {}
+        self.tombstones: list[TombstoneRecord] = []
+
+        self.student_ids_by_email: dict[str, int] = {}
+        self.group_ids_by_name: dict[str, int] = {}
+        self.student_groups: dict[int, set[int]] = {}
+        self.group_students: dict[int, set[int]] = {}
+
+        self._student_ids = count(1)
+        self._group_ids = count(1)
+        self._tombstone_ids = count(1)
+
+    def next_student_id(self) -> int:
+        return next(self._student_ids)
+
+    def next_group_id(self) -> int:
+        return next(self._group_ids)
+
+    def add_tombstone(self, entity: str, entity_id: int, group_id: int | None = None) -> None:
+        """Записать удаление"""
+        self.tombstones.append(TombstoneRecord(next(self._tombstone_ids), entity, entity_id, group_id, _now()))
+
+    def remove_membership(self, student_id: int, group_id: int) -> None:
+        """Удалить связь из всех индексов (без записи об удалении)"""
+        del self.memberships[(student_id, group_id)]
+        self.student_groups[student_id].discard(group_id)
+        self.group_students[group_id].discard(student_id)
+
+    def membership_snapshot(self) -> tuple[list[int], list[int], dict[int, list[int]]]:
+        """ID групп, ID студентов и состав групп для индекса членства"""
+        return (
+            list(self.groups),
+            list(self.students),
+            {group_id: list(student_ids) for group_id, student_ids in self.group_students.items()},
+        )
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Всё или ничего для блока операций: при исключении данные и индексы
+        возвращаются к снимку, сделанному на входе
+
+        Счётчики ID не откатываются, как и sequence в PostgreSQL.
+        Репозитории в памяти не уступают управление циклу событий,
+        поэтому другие запросы не вклиниваются между снимком и откатом
+        """
+        snapshot = (
+            dict(self.students), dict(self.groups), dict(self.memberships), list(self.tombstones),
+            dict(self.student_ids_by_email), dict(self.group_ids_by_name),
+            {student_id: set(group_ids) for student_id, group_ids in self.student_groups.items()},
+            {group_id: set(student_ids) for group_id, student_ids in self.group_students.items()},
+        )
+        try:
+            yield self
+        except BaseException:
+            (
+                self.students, self.groups, self.memberships, self.tombstones,
+                self.student_ids_by_email, self.group_ids_by_name,
+                self.student_groups, self.group_students,
+            ) = snapshot
+            raise
+
+
+@traced_methods("repository")
+class InMemoryStudentRepository:
+    """Репозиторий студентов в памяти"""
+
+    def __init__(self, storage: MemoryStorage):
+        self.storage = storage
+
+    async def create(self, first_name: str, last_name: str, email: str) -> StudentRecord:
+        """
+        Создать нового студента
+
+        Raises:
+            ValueError: Если email уже занят
+        """
+        if email in self.storage.student_ids_by_email:
+            raise ValueError(f"Студент с email {email} уже существует")
+        now = _now()
+        student = StudentRecord(self.storage.next_student_id(), first_name, last_name, email, now, now, self.storage)
+        self.storage.students[student.id] = student
+        self.storage.student_ids_by_email[email] = student.id
+        self.storage.student_groups[student.id] = set()
+        return student
+
+    async def get_by_id(self, student_id: int) -> StudentRecord | None:
+        """Получить студента по ID"""
+        return self.storage.students.get(student_id)
+
+    async def get_all(
+            self,
+            group_id: int | None = None,
+            last_name: str | None = None,
+            email_domain: str | None = None,
+            sort: str = "id"
+    ) -> list[StudentRecord]:
+        """Получить студентов с фильтрами и сортировкой, как StudentRepository.get_all"""
+        if group_id is not None:
+            students = [self.storage.students[i] for i in self.storage.group_students.get(group_id, ())]
+        else:
+            students = list(self.storage.students.values())
+        if last_name is not None:
+            students = [student for student in students if student.last_name == last_name]
+        if email_domain is not None:
+            domain = email_domain.lower()
+            students = [student for student in students if student.email.partition("@")[2].lower() == domain]
+        return _sorted(students, sort, STUDENT_SORT_KEYS)
+
+    async def delete(self, student_id: int) -> list[int] | None:
+        """Удалить студента по ID, вернуть ID его бывших групп (None, если не найден)"""
+        deleted = await self.delete_many([student_id])
+        return deleted.get(student_id)
+
+    async def delete_many(self, student_ids: list[int]) -> dict[int, list[int]]:
+        """Удалить студентов по списку ID, вернуть ID реально удалённых и их бывших групп"""
+        deleted_groups = {}
+        for student_id in dict.fromkeys(student_ids):
+            student = self.storage.students.pop(student_id, None)
+            if student is None:
+                continue
+            del self.storage.student_ids_by_email[student.email]
+            group_ids = sorted(self.storage.student_groups[student_id])
+            for group_id in group_ids:
+                self.storage.remove_membership(student_id, group_id)
+            del self.storage.student_groups[student_id]
+            self.storage.add_tombstone("student", student_id)
+            deleted_groups[student_id] = group_ids
+        return deleted_groups
+
+    async def warmup(self) -> None:
+        """Прогревать нечего"""
+
+
+@traced_methods("repository")
+class InMemoryGroupRepository:
+    """Репозиторий групп в памяти"""
+
+    def __init__(self, storage: MemoryStorage):
+        self.storage = storage
+
+    async def create(self, name: str, description: str | None = None) -> GroupRecord:
+        """
+        Создать новую группу
+
+        Raises:
+            ValueError: Если название уже занято
+        """
+        if name in self.storage.group_ids_by_name:
+            raise ValueError(f"Группа {name} уже существует")
+        now = _now()
+        group = GroupRecord(self.storage.next_group_id(), name, description, now, now, self.storage)
+        self.storage.groups[group.id] = group
+        self.storage.group_ids_by_name[name] = group.id
+        self.storage.group_students[group.id] = set()
+        return group
+
+    async def get_by_id(self, group_id: int) -> GroupRecord | None:
+        """Получить группу по ID"""
+        return self.storage.groups.get(group_id)
+
+    async def get_all(
+            self,
+            name_prefix: str | None = None,
+            min_size: int | None = None,
+            sort: str = "id"
+    ) -> list[GroupRecord]:
+        """Получить группы с фильтрами и сортировкой, как GroupRepository.get_all"""
+        groups = list(self.storage.groups.values())
+        if name_prefix is not None:
+            groups = [group for group in groups if group.name.startswith(name_prefix)]
+        if min_size:
+            groups = [group for group in groups if len(self.storage.group_students[group.id]) >= min_size]
+        return _sorted(groups, sort, GROUP_SORT_KEYS)
+
+    async def delete(self, group_id: int) -> bool:
+        """Удалить группу по ID вместе со связями"""
+        group = self.storage.groups.pop(group_id, None)
+        if group is None:
+            return False
+        del self.storage.group_ids_by_name[group.name]
+        for student_id in list(self.storage.group_students[group_id]):
+            self.storage.remove_membership(student_id, group_id)
+        del self.storage.group_students[group_id]
+        self.storage.add_tombstone("group", group_id)
+        return True
+
+    async def add_student_to_group(self, student_id: int, group_id: int) -> bool:
+        """Добавить студента в группу, False если студент или группа не найдены"""
+        if student_id not in self.storage.students or group_id not in self.storage.groups:
+            return False
+        if (student_id, group_id) not in self.storage.memberships:
+            now = _now()
+            self.storage.memberships[(student_id, group_id)] = MembershipRecord(student_id, group_id, now, now)
+            self.storage.student_groups[student_id].add(group_id)
+            self.storage.group_students[group_id].add(student_id)
+        return True
+
+    async def remove_student_from_group(self, student_id: int, group_id: int) -> bool:
+        """Удалить студента из группы, False если он в ней не состоит"""
+        if (student_id, group_id) not in self.storage.memberships:
+            return False
+        self.storage.remove_membership(student_id, group_id)
+        self.storage.add_tombstone("membership", student_id, group_id)
+        return True
+
+    async def warmup(self) -> None:
+        """Прогревать нечего"""
+
+
+@traced_methods("repository")
+class InMemorySyncRepository:
+    """Репозиторий синхронизации в памяти (полный перебор, для тестов)"""
+
+    def __init__(self, storage: MemoryStorage):
+        self.storage = storage
+
+    @staticmethod
+    def _changed_since(records, key, cursor: tuple | None, limit: int, lag: timedelta) -> list:
+        """Записи с ключом больше курсора, не моложе lag, в порядке ключа"""
+        horizon = _now() - lag
+        selected = [
+            record for record in records
+            if key(record)[0] < horizon and (cursor is None or key(record) > tuple(cursor))
+        ]
+        selected.sort(key=key)
+        return selected[:limit]
+
+    async def students_since(self, cursor, limit: int, lag: timedelta) -> list[StudentRecord]:
+        return self._changed_since(self.storage.students.values(), lambda r: (r.updated_at, r.id), cursor, limit, lag)
+
+    async def groups_since(self, cursor, limit: int, lag: timedelta) -> list[GroupRecord]:
+        return self._changed_since(self.storage.groups.values(), lambda r: (r.updated_at, r.id), cursor, limit, lag)
+
+    async def memberships_since(self, cursor, limit: int, lag: timedelta) -> list[MembershipRecord]:
+        return self._changed_since(
+            self.storage.memberships.values(), lambda r: (r.updated_at, r.student_id, r.group_id), cursor, limit, lag
+        )
+
+    async def tombstones_since(self, cursor, limit: int, lag: timedelta) -> list[TombstoneRecord]:
+        return self._changed_since(self.storage.tombstones, lambda r: (r.deleted_at, r.id), cursor, limit, lag)
+
+    async def warmup(self) -> None:
+        """Прогревать нечего"""
+
+
+# Одно хранилище на процесс
+memory_storage = MemoryStorage()
@@ -1,12 +1,86 @@
 """
 Repository Layer - слой работы с базой данных
 """
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, insert, exists, tuple_, func, literal, table, column, JSON
+from sqlalchemy.dialects.postgresql import insert as pg_insert, aggregate_order_by
 from sqlalchemy.orm import selectinload
-from src.models.models import Student, Group
-
-
+from src.models.models import Student, Group, Tombstone, student_group_association
+from src.tracing.tracing import traced_methods
+
+# ID, которого нет в БД (serial начинается с 1), для прогрева запросов
+WARMUP_ID = 0
+
+# Таблицы моделей для запросов Core, минуя ORM
+students_table = Student.__table__
+groups_table = Group.__table__
+
+# Колонки ORDER BY для допустимых сортировок (см. StudentSort и GroupSort в схемах).
+# Последняя колонка - первичный ключ, чтобы порядок был однозначным
+STUDENT_SORT_COLUMNS = {
+    "id": (students_table.c.id,),
+    "last_name": (students_table.c.last_name, students_table.c.first_name, students_table.c.id),
+    "email": (students_table.c.email,),
+}
+GROUP_SORT_COLUMNS = {
+    "id": (groups_table.c.id,),
+    "name": (groups_table.c.name,),
+}
+
+
+@dataclass(slots=True)
+class GroupItem:
+    """Группа в списке групп студента (атрибуты совпадают с GroupResponse)"""
+    id: int
+    name: str
+    description: str | None
+
+
+@dataclass(slots=True)
+class StudentItem:
+    """Студент в составе группы (атрибуты совпадают с StudentResponse)"""
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+
+
+@dataclass(slots=True)
+class GroupRow:
+    """Группа из списка GET /groups, без ORM (атрибуты совпадают с GroupWithStudents)"""
+    id: int
+    name: str
+    description: str | None
+    students: list[StudentItem]
+
+
+@dataclass(slots=True)
+class StudentRow:
+    """Студент из списка GET /students, без ORM (атрибуты совпадают с StudentWithGroups)"""
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+    groups: list[GroupItem]
+
+
+def _order_by(sort: str, columns: dict[str, tuple]) -> list:
+    """
+    Выражения ORDER BY для сортировки вида "name" или "-name"
+
+    Raises:
+        ValueError: Если сортировка не из разрешённого списка
+    """
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in columns:
+        raise ValueError(f"Сортировка {sort} не поддерживается")
+    return [column.desc() if descending else column.asc() for column in columns[key]]
+
+
+@traced_methods("repository")
 class StudentRepository:
     """Репозиторий для работы со студентами"""
 
@@ -45,18 +119,78 @@ class StudentRepository:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_all(self) -> list[Student]:
+    async def get_all(
+            self,
+            group_id: int | None = None,
+            last_name: str | None = None,
+            email_domain: str | None = None,
+            sort: str = "id"
+    ) -> list[StudentRow]:
         """
-        Получить всех студентов с их группами
+        Получить студентов с их группами
+
+        Только чтение, поэтому запрос идёт через Core: строки не попадают
+        в identity map сессии, группы приходят одним JSON-массивом на студента
+
+        Args:
+            group_id: Только студенты этой группы
+            last_name: Только студенты с этой фамилией
+            email_domain: Только студенты с email в этом домене (без учёта регистра)
+            sort: Сортировка из STUDENT_SORT_COLUMNS, "-" - по убыванию
 
         Returns:
-            Список объектов Student
+            Список StudentRow
         """
-        stmt = select(Student).options(selectinload(Student.groups))
+        stmt = self._select_all(group_id, last_name, email_domain, sort)
         result = await self.session.execute(stmt)
-        return list(result.scalars().all())
-
-    async def delete(self, student_id: int) -> bool:
+        return [
+            StudentRow(student_id, first_name, last_name, email, [GroupItem(*group) for group in groups or ()])
+            for student_id, first_name, last_name, email, groups in result
+        ]
+
+    @staticmethod
+    def _select_all(
+            group_id: int | None = None,
+            last_name: str | None = None,
+            email_domain: str | None = None,
+            sort: str = "id"
+    ):
+        """Запрос студентов с группами, каждый фильтр опирается на свой индекс"""
+        table = student_group_association
+        # Группы студента по первичному ключу связей (student_id, group_id)
+        student_groups = (
+            select(func.json_agg(
+                aggregate_order_by(
+                    func.json_build_array(groups_table.c.id, groups_table.c.name, groups_table.c.description),
+                    groups_table.c.id
+                ),
+                type_=JSON
+            ))
+            .select_from(table.join(groups_table, groups_table.c.id == table.c.group_id))
+            .where(table.c.student_id == students_table.c.id)
+            .scalar_subquery()
+        )
+        stmt = select(
+            students_table.c.id,
+            students_table.c.first_name,
+            students_table.c.last_name,
+            students_table.c.email,
+            student_groups.label("groups"),
+        )
+        if group_id is not None:
+            # Отдельный псевдоним, чтобы фильтр не смешивался с подзапросом групп
+            membership = table.alias("membership")
+            stmt = stmt.join(
+                membership, membership.c.student_id == students_table.c.id
+            ).where(membership.c.group_id == group_id)
+        if last_name is not None:
+            stmt = stmt.where(students_table.c.last_name == last_name)
+        if email_domain is not None:
+            # То же выражение, что в индексе ix_students_email_domain
+            stmt = stmt.where(func.lower(func.split_part(students_table.c.email, "@", 2)) == email_domain.lower())
+        return stmt.order_by(*_order_by(sort, STUDENT_SORT_COLUMNS))
+
+    async def delete(self, student_id: int) -> list[int] | None:
         """
         Удалить студента по ID
 
@@ -64,16 +198,67 @@ class StudentRepository:
             student_id: ID студента
 
         Returns:
-            True если удалён, False если не найден
+            ID групп, в которых состоял студент, или None, если он не найден
+        """
+        deleted = await self.delete_many([student_id])
+        return deleted.get(student_id)
+
+    async def delete_many(self, student_ids: list[int]) -> dict[int, list[int]]:
         """
-        student = await self.get_by_id(student_id)
-        if student:
-            await self.session.delete(student)
-            await self.session.commit()
-            return True
-        return False
+        Удалить студентов по списку ID одним запросом
+
+        Студенты и их группы в сессию не загружаются,
+        связи удаляет сама БД (ON DELETE CASCADE)
 
+        Args:
+            student_ids: ID студентов
 
+        Returns:
+            ID реально удалённых студентов и ID групп, в которых каждый состоял
+        """
+        table = student_group_association
+        # Все части запроса видят один снимок, поэтому связи читаются до каскадного удаления
+        memberships = (
+            select(table.c.student_id, func.array_agg(table.c.group_id).label("group_ids"))
+            .where(table.c.student_id.in_(student_ids))
+            .group_by(table.c.student_id)
+            .cte("memberships")
+        )
+        deleted = (
+            delete(students_table)
+            .where(students_table.c.id.in_(student_ids))
+            .returning(students_table.c.id)
+            .cte("deleted")
+        )
+        stmt = select(deleted.c.id, memberships.c.group_ids).select_from(
+            deleted.outerjoin(memberships, memberships.c.student_id == deleted.c.id)
+        )
+        result = await self.session.execute(stmt)
+        deleted_groups = {student_id: sorted(group_ids or ()) for student_id, group_ids in result}
+        if deleted_groups:
+            await self.session.execute(
+                insert(Tombstone),
+                [{"entity": "student", "entity_id": deleted_id} for deleted_id in deleted_groups]
+            )
+        await self.session.commit()
+        return deleted_groups
+
+    async def warmup(self) -> None:
+        """
+        Подготовить запросы репозитория на соединении сессии
+
+        Вызывается при старте внутри транзакции, которая затем откатывается.
+        Вставки не прогреваются, чтобы не расходовать значения sequence
+        """
+        await self.get_by_id(WARMUP_ID)
+        await self.delete(WARMUP_ID)
+        # Для списка достаточно подготовить запрос, читать всю таблицу не нужно
+        result = await self.session.stream(self._select_all())
+        await result.fetchmany(1)
+        await result.close()
+
+
+@traced_methods("repository")
 class GroupRepository:
     """Репозиторий для работы с группами"""
 
@@ -111,16 +296,72 @@ class GroupRepository:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_all(self) -> list[Group]:
+    async def get_all(
+            self,
+            name_prefix: str | None = None,
+            min_size: int | None = None,
+            sort: str = "id"
+    ) -> list[GroupRow]:
         """
-        Получить все группы со списками студентов
+        Получить группы со списками студентов
+
+        Только чтение, поэтому запрос идёт через Core (см. StudentRepository.get_all)
+
+        Args:
+            name_prefix: Только группы, название которых начинается с префикса
+            min_size: Только группы, в которых не меньше min_size студентов
+            sort: Сортировка из GROUP_SORT_COLUMNS, "-" - по убыванию
 
         Returns:
-            Список объектов Group
+            Список GroupRow
         """
-        stmt = select(Group).options(selectinload(Group.students))
+        stmt = self._select_all(name_prefix, min_size, sort)
         result = await self.session.execute(stmt)
-        return list(result.scalars().all())
+        return [
+            GroupRow(group_id, name, description, [StudentItem(*student) for student in students or ()])
+            for group_id, name, description, students in result
+        ]
+
+    @staticmethod
+    def _select_all(name_prefix: str | None = None, min_size: int | None = None, sort: str = "id"):
+        """Запрос групп со студентами, каждый фильтр опирается на свой индекс"""
+        table = student_group_association
+        # Студенты группы по индексу ix_student_group_association_group_id
+        group_students = (
+            select(func.json_agg(
+                aggregate_order_by(
+                    func.json_build_array(
+                        students_table.c.id,
+                        students_table.c.first_name,
+                        students_table.c.last_name,
+                        students_table.c.email
+                    ),
+                    students_table.c.id
+                ),
+                type_=JSON
+            ))
+            .select_from(table.join(students_table, students_table.c.id == table.c.student_id))
+            .where(table.c.group_id == groups_table.c.id)
+            .scalar_subquery()
+        )
+        stmt = select(
+            groups_table.c.id,
+            groups_table.c.name,
+            groups_table.c.description,
+            group_students.label("students"),
+        )
+        if name_prefix is not None:
+            # LIKE 'префикс%' с экранированием % и _ использует ix_groups_name_prefix
+            stmt = stmt.where(groups_table.c.name.startswith(name_prefix, autoescape=True))
+        if min_size:
+            # Размеры групп считаются по индексу ix_student_group_association_group_id
+            large_groups = (
+                select(table.c.group_id)
+                .group_by(table.c.group_id)
+                .having(func.count() >= min_size)
+            )
+            stmt = stmt.where(groups_table.c.id.in_(large_groups))
+        return stmt.order_by(*_order_by(sort, GROUP_SORT_COLUMNS))
 
     async def delete(self, group_id: int) -> bool:
         """
@@ -132,12 +373,14 @@ class GroupRepository:
         Returns:
             True если удалена, False если не найдена
         """
-        group = await self.get_by_id(group_id)
-        if group:
-            await self.session.delete(group)
-            await self.session.commit()
-            return True
-        return False
+        stmt = delete(Group).where(Group.id == group_id).returning(Group.id)
+        result = await self.session.execute(stmt, execution_options={"synchronize_session": False})
+        if result.scalar_one_or_none() is None:
+            return False
+        # Студенты группы не загружаются, связи удаляет сама БД (ON DELETE CASCADE)
+        self.session.add(Tombstone(entity="group", entity_id=group_id))
+        await self.session.commit()
+        return True
 
     async def add_student_to_group(self, student_id: int, group_id: int) -> bool:
         """
@@ -150,16 +393,23 @@ class GroupRepository:
         Returns:
             True если добавлен, False если студент или группа не найдены
         """
-        group = await self.get_by_id(group_id)
-        student_repo = StudentRepository(self.session)
-        student = await student_repo.get_by_id(student_id)
-
-        if group and student:
-            if student not in group.students:
-                group.students.append(student)
-                await self.session.commit()
-            return True
-        return False
+        # Составы группы и студента не загружаются: при секционировании
+        # их чтение затронуло бы все секции, а вставка и удаление ниже
+        # задают оба ключа и попадают ровно в одну
+        found = await self.session.execute(
+            select(
+                exists().where(Student.id == student_id),
+                exists().where(Group.id == group_id),
+            )
+        )
+        student_exists, group_exists = found.one()
+        if not (student_exists and group_exists):
+            return False
+
+        stmt = pg_insert(student_group_association).values(student_id=student_id, group_id=group_id)
+        await self.session.execute(stmt.on_conflict_do_nothing())
+        await self.session.commit()
+        return True
 
     async def remove_student_from_group(self, student_id: int, group_id: int) -> bool:
         """
@@ -172,12 +422,135 @@ class GroupRepository:
         Returns:
             True если удалён, False если студент не найден в группе
         """
-        group = await self.get_by_id(group_id)
-        student_repo = StudentRepository(self.session)
-        student = await student_repo.get_by_id(student_id)
+        table = student_group_association
+        stmt = (
+            delete(table)
+            .where(table.c.student_id == student_id, table.c.group_id == group_id)
+            .returning(table.c.student_id)
+        )
+        result = await self.session.execute(stmt)
+        if result.scalar_one_or_none() is None:
+            return False
+        self.session.add(Tombstone(entity="membership", entity_id=student_id, group_id=group_id))
+        await self.session.commit()
+        return True
+
+    async def warmup(self) -> None:
+        """
+        Подготовить запросы репозитория на соединении сессии
+
+        Вызывается при старте внутри транзакции, которая затем откатывается.
+        Вставки не прогреваются, чтобы не расходовать значения sequence
+        """
+        await self.get_by_id(WARMUP_ID)
+        await self.delete(WARMUP_ID)
+        await self.add_student_to_group(WARMUP_ID, WARMUP_ID)
+        await self.remove_student_from_group(WARMUP_ID, WARMUP_ID)
+        result = await self.session.stream(self._select_all())
+        await result.fetchmany(1)
+        await result.close()
+
+
+# Системное представление с транзакциями других соединений (для горизонта синхронизации)
+pg_stat_activity = table(
+    "pg_stat_activity", column("pid"), column("datname"), column("backend_type"), column("xact_start")
+)
 
-        if group and student and student in group.students:
-            group.students.remove(student)
-            await self.session.commit()
-            return True
-        return False
\ No newline at end of file
+
+@traced_methods("repository")
+class SyncRepository:
+    """
+    Репозиторий для инкрементальной синхронизации
+
+    Каждый поток изменений (студенты, группы, связи, удаления) читается
+    по своему курсору (время изменения, ключ) с опорой на индекс по тем же колонкам
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _changed_since(self, stmt, key_columns: tuple, cursor: tuple | None, limit: int, lag: timedelta):
+        """
+        Выбрать строки, изменённые после курсора
+
+        Args:
+            stmt: Базовый select
+            key_columns: Колонки курсора (время изменения и первичный ключ)
+            cursor: Последние выданные значения key_columns или None
+            limit: Максимум строк
+            lag: Строки моложе now() - lag не выдаются
+
+        Returns:
+            Список строк в порядке курсора
+        """
+        stmt = stmt.where(key_columns[0] < self._horizon(lag))
+        if cursor is not None:
+            bound = [literal(value, column.type) for column, value in zip(key_columns, cursor)]
+            stmt = stmt.where(tuple_(*key_columns) > tuple_(*bound))
+        stmt = stmt.order_by(*key_columns).limit(limit)
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    def _horizon(lag: timedelta):
+        """
+        Граница выдачи: строки с временем не раньше неё ещё могут появиться
+
+        Время изменения - now() транзакции, то есть время её начала, поэтому
+        незакоммиченная транзакция позже запишет строки со временем из прошлого.
+        Граница не позже начала самой старой открытой транзакции в БД
+        (кроме своей): транзакция без записей ещё может их сделать,
+        поэтому учитываются все, а не только получившие xid
+        """
+        oldest_transaction = (
+            select(func.min(pg_stat_activity.c.xact_start))
+            .where(
+                pg_stat_activity.c.datname == func.current_database(),
+                pg_stat_activity.c.backend_type == "client backend",
+                pg_stat_activity.c.pid != func.pg_backend_pid(),
+            )
+            .scalar_subquery()
+        )
+        # LEAST пропускает NULL, если открытых транзакций нет
+        return func.least(func.now() - lag, oldest_transaction)
+
+    async def students_since(self, cursor: tuple[datetime, int] | None, limit: int, lag: timedelta) -> list[Student]:
+        """Студенты, созданные или изменённые после курсора"""
+        rows = await self._changed_since(select(Student), (Student.updated_at, Student.id), cursor, limit, lag)
+        return [row[0] for row in rows]
+
+    async def groups_since(self, cursor: tuple[datetime, int] | None, limit: int, lag: timedelta) -> list[Group]:
+        """Группы, созданные или изменённые после курсора"""
+        rows = await self._changed_since(select(Group), (Group.updated_at, Group.id), cursor, limit, lag)
+        return [row[0] for row in rows]
+
+    async def memberships_since(self, cursor: tuple[datetime, int, int] | None, limit: int, lag: timedelta) -> list:
+        """Связи студент-группа, созданные или изменённые после курсора"""
+        table = student_group_association
+        return await self._changed_since(
+            select(table.c.student_id, table.c.group_id, table.c.created_at, table.c.updated_at),
+            (table.c.updated_at, table.c.student_id, table.c.group_id),
+            cursor, limit, lag
+        )
+
+    async def tombstones_since(self, cursor: tuple[datetime, int] | None, limit: int, lag: timedelta) -> list[Tombstone]:
+        """Записи об удалении после курсора"""
+        rows = await self._changed_since(select(Tombstone), (Tombstone.deleted_at, Tombstone.id), cursor, limit, lag)
+        return [row[0] for row in rows]
+
+    async def warmup(self) -> None:
+        """
+        Подготовить запросы синхронизации на соединении сессии
+
+        Каждый поток читается в двух вариантах: без курсора и с курсором
+        """
+        lag = timedelta(0)
+        epoch = datetime.fromtimestamp(0).astimezone()
+        await self.students_since(None, 1, lag)
+        await self.students_since((epoch, WARMUP_ID), 1, lag)
+        await self.groups_since(None, 1, lag)
+        await self.groups_since((epoch, WARMUP_ID), 1, lag)
+        await self.memberships_since(None, 1, lag)
+        await self.memberships_since((epoch, WARMUP_ID, WARMUP_ID), 1, lag)
+        await self.tombstones_since(None, 1, lag)
+        await self.tombstones_since((epoch, WARMUP_ID), 1, lag)
@@ -2,7 +2,15 @@
 Pydantic схемы для валидации входных и выходных данных
 Используются в API эндпоинтах для проверки данных
 """
-from pydantic import BaseModel, EmailStr, ConfigDict
+from datetime import datetime
+from typing import Annotated, Literal
+from pydantic import BaseModel, EmailStr, ConfigDict, Field
+
+
+# Допустимые сортировки списков ("-" - по убыванию)
+# Только колонки с индексом, чтобы клиент не мог запустить сортировку всей таблицы
+StudentSort = Literal["id", "-id", "last_name", "-last_name", "email", "-email"]
+GroupSort = Literal["id", "-id", "name", "-name"]
 
 
 class StudentBase(BaseModel):
@@ -87,4 +95,165 @@ class TransferStudent(BaseModel):
     """
     student_id: int
     from_group_id: int
-    to_group_id: int
\ No newline at end of file
+    to_group_id: int
+
+
+class GroupQueryResult(BaseModel):
+    """
+    Результат запроса по составу групп
+    Используется в GET /groups/query
+    """
+    count: int
+    offset: int
+    limit: int
+    student_ids: list[int]
+
+
+class ChangeEvent(BaseModel):
+    """
+    Событие ленты изменений
+    Отправляется в GET /changes/stream и /changes/ws
+
+    - **type**: student_created, student_deleted, group_created, group_deleted,
+      student_added_to_group, student_removed_from_group, student_transferred
+    - **student_id**: ID студента, если событие касается студента
+    - **group_ids**: ID затронутых групп (по ним фильтруются подписчики)
+    """
+    type: str
+    student_id: int | None = None
+    group_ids: list[int] = []
+
+
+# ID в операции пакета: число или ссылка (ref) на объект, созданный раньше в том же пакете
+BatchId = int | str
+
+
+class BatchCreateStudent(StudentCreate):
+    """Операция пакета: создать студента, ref - имя для ссылок из следующих операций"""
+    op: Literal["create_student"]
+    ref: str | None = None
+
+
+class BatchDeleteStudent(BaseModel):
+    """Операция пакета: удалить студента"""
+    op: Literal["delete_student"]
+    student_id: BatchId
+
+
+class BatchCreateGroup(GroupCreate):
+    """Операция пакета: создать группу, ref - имя для ссылок из следующих операций"""
+    op: Literal["create_group"]
+    ref: str | None = None
+
+
+class BatchDeleteGroup(BaseModel):
+    """Операция пакета: удалить группу"""
+    op: Literal["delete_group"]
+    group_id: BatchId
+
+
+class BatchAddStudentToGroup(BaseModel):
+    """Операция пакета: добавить студента в группу"""
+    op: Literal["add_student_to_group"]
+    student_id: BatchId
+    group_id: BatchId
+
+
+class BatchRemoveStudentFromGroup(BaseModel):
+    """Операция пакета: удалить студента из группы"""
+    op: Literal["remove_student_from_group"]
+    student_id: BatchId
+    group_id: BatchId
+
+
+class BatchTransferStudent(BaseModel):
+    """Операция пакета: перевести студента между группами"""
+    op: Literal["transfer_student"]
+    student_id: BatchId
+    from_group_id: BatchId
+    to_group_id: BatchId
+
+
+BatchOperation = Annotated[
+    BatchCreateStudent | BatchDeleteStudent | BatchCreateGroup | BatchDeleteGroup
+    | BatchAddStudentToGroup | BatchRemoveStudentFromGroup | BatchTransferStudent,
+    Field(discriminator="op")
+]
+
+
+class BatchRequest(BaseModel):
+    """
+    Пакет операций для POST /batch
+
+    Операции выполняются по порядку в одной транзакции:
+    либо все, либо ни одной
+    """
+    operations: list[BatchOperation] = Field(min_length=1, max_length=1000)
+
+
+class BatchResult(BaseModel):
+    """
+    Результат одной операции пакета
+
+    - **id**: ID созданного объекта (только для create_student и create_group)
+    """
+    op: str
+    id: int | None = None
+
+
+class BatchResponse(BaseModel):
+    """Результаты операций пакета в том же порядке"""
+    results: list[BatchResult]
+
+
+class SyncStudent(StudentResponse):
+    """Студент в ответе GET /sync"""
+    created_at: datetime
+    updated_at: datetime
+
+
+class SyncGroup(GroupResponse):
+    """Группа в ответе GET /sync"""
+    created_at: datetime
+    updated_at: datetime
+
+
+class SyncMembership(BaseModel):
+    """Связь студент-группа в ответе GET /sync"""
+    student_id: int
+    group_id: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SyncTombstone(BaseModel):
+    """
+    Запись об удалении в ответе GET /sync
+
+    - **entity**: student, group или membership
+    - **entity_id**: ID студента или группы (для membership - ID студента)
+    - **group_id**: ID группы (только для membership)
+    """
+    entity: str
+    entity_id: int
+    group_id: int | None = None
+    deleted_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SyncResponse(BaseModel):
+    """
+    Страница изменений для GET /sync
+
+    - **watermark**: передайте в since следующего запроса
+    - **has_more**: есть ли ещё изменения сверх этой страницы
+    """
+    students: list[SyncStudent] = []
+    groups: list[SyncGroup] = []
+    memberships: list[SyncMembership] = []
+    tombstones: list[SyncTombstone] = []
+    watermark: str
+    has_more: bool
@@ -0,0 +1,297 @@
+"""
+Индекс членства в группах в памяти процесса.
+Каждая группа хранится как битовая карта ID студентов, что позволяет
+отвечать на запросы вида "в группах A и B, но не в C" без обращения к БД
+"""
+import asyncio
+import logging
+import time
+
+from sqlalchemy import select
+from src.config import settings
+from src.database.database import async_session_maker
+from src.repositories.memory import memory_storage
+from src.models.models import Student, Group, student_group_association
+from src.schemas.schemas import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+# Битовая карта со смещением: (base, bits), бит i соответствует студенту base + i.
+# Смещение кратно 64, поэтому память группы зависит от разброса ID её студентов,
+# а не от максимального ID в базе
+Bitmap = tuple[int, int]
+
+EMPTY: Bitmap = (0, 0)
+
+# Размер блока, который page пропускает целиком (65536 студентов)
+PAGE_BLOCK_BYTES = 8192
+
+
+def _bitmap_from_ids(student_ids: list[int]) -> Bitmap:
+    """Собрать битовую карту из списка ID"""
+    if not student_ids:
+        return EMPTY
+    base = min(student_ids) & ~63
+    buffer = bytearray((max(student_ids) - base) // 8 + 1)
+    for student_id in student_ids:
+        offset = student_id - base
+        buffer[offset >> 3] |= 1 << (offset & 7)
+    return base, int.from_bytes(buffer, "little")
+
+
+def _with_student(bitmap: Bitmap, student_id: int) -> Bitmap:
+    """Карта с добавленным студентом"""
+    base, bits = bitmap
+    if not bits:
+        base = student_id & ~63
+        return base, 1 << (student_id - base)
+    if student_id < base:
+        new_base = student_id & ~63
+        return new_base, (bits << (base - new_base)) | 1 << (student_id - new_base)
+    return base, bits | 1 << (student_id - base)
+
+
+def _without_student(bitmap: Bitmap, student_id: int) -> Bitmap:
+    """Карта без студента"""
+    base, bits = bitmap
+    if student_id < base or not (bits >> (student_id - base)) & 1:
+        return bitmap
+    bits &= ~(1 << (student_id - base))
+    return (base, bits) if bits else EMPTY
+
+
+def _and(left: Bitmap, right: Bitmap) -> Bitmap:
+    """Пересечение: общая часть начинается с большего смещения"""
+    base = max(left[0], right[0])
+    bits = (left[1] >> (base - left[0])) & (right[1] >> (base - right[0]))
+    return (base, bits) if bits else EMPTY
+
+
+def _or(left: Bitmap, right: Bitmap) -> Bitmap:
+    """Объединение: результат начинается с меньшего смещения"""
+    if not left[1]:
+        return right
+    if not right[1]:
+        return left
+    base = min(left[0], right[0])
+    return base, (left[1] << (left[0] - base)) | (right[1] << (right[0] - base))
+
+
+def _and_not(left: Bitmap, right: Bitmap) -> Bitmap:
+    """Разность: смещение левой карты сохраняется"""
+    base, bits = left
+    if right[0] >= base:
+        mask = right[1] << (right[0] - base)
+    else:
+        mask = right[1] >> (base - right[0])
+    bits &= ~mask
+    return (base, bits) if bits else EMPTY
+
+
+class MembershipIndex:
+    """
+    Индекс членства студентов в группах
+
+    Строится из student_group_association при старте и после каждого
+    переподключения ленты изменений, дальше поддерживается событиями
+    ленты, поэтому одинаково актуален во всех воркерах
+    """
+
+    def __init__(self, session_maker=async_session_maker, retry_delay: float = 1.0, max_retry_delay: float = 60.0):
+        self.session_maker = session_maker
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.ready = False
+
+        self._groups: dict[int, Bitmap] = {}
+        self._students: Bitmap = EMPTY  # Все существующие студенты (для none без all/any)
+        self._pending: list[ChangeEvent] | None = None  # События, пришедшие во время пересборки
+        self._lock = asyncio.Lock()
+        self._rebuild_task: asyncio.Task | None = None
+
+    async def rebuild(self) -> None:
+        """Полностью пересобрать индекс из БД"""
+        async with self._lock:
+            started = time.perf_counter()
+            self._pending = []
+            try:
+                group_ids, student_ids, members = await self._load()
+                groups = {group_id: _bitmap_from_ids(members.get(group_id, [])) for group_id in group_ids}
+                students = _bitmap_from_ids(student_ids)
+            except Exception:
+                self._pending = None
+                self.ready = False
+                raise
+
+            pending, self._pending = self._pending, None
+            self._groups, self._students = groups, students
+            # События идемпотентны, поэтому повторное применение тех, что уже попали в снимок, безопасно
+            for event in pending:
+                self.apply(event)
+            self.ready = True
+            logger.info(
+                "Индекс членства собран: %d групп, %d студентов за %.1f мс",
+                len(groups), students[1].bit_count(), (time.perf_counter() - started) * 1000
+            )
+
+    async def _load(self) -> tuple[list[int], list[int], dict[int, list[int]]]:
+        """ID групп, ID студентов и состав групп из хранилища"""
+        if settings.STORAGE_BACKEND == "memory":
+            return memory_storage.membership_snapshot()
+
+        members: dict[int, list[int]] = {}
+        async with self.session_maker() as session:
+            group_ids = (await session.execute(select(Group.id))).scalars().all()
+            student_ids = (await session.execute(select(Student.id))).scalars().all()
+            stmt = select(student_group_association.c.group_id, student_group_association.c.student_id)
+            result = await session.stream(stmt.execution_options(yield_per=10000))
+            async for group_id, student_id in result:
+                members.setdefault(group_id, []).append(student_id)
+        return list(group_ids), list(student_ids), members
+
+    def on_feed_connection(self, connected: bool) -> None:
+        """
+        Колбэк подключения ленты изменений
+
+        Пока ленты нет, изменения не доходят и индекс устаревает,
+        после переподключения он пересобирается
+        """
+        if self._rebuild_task is not None:
+            self._rebuild_task.cancel()
+            self._rebuild_task = None
+        if not connected:
+            self.ready = False
+            return
+        self._rebuild_task = asyncio.create_task(self._rebuild_until_ready())
+
+    async def _rebuild_until_ready(self) -> None:
+        """Пересобирать индекс, пока не получится, с растущей паузой между попытками"""
+        delay = self.retry_delay
+        while True:
+            try:
+                await self.rebuild()
+                return
+            except Exception as e:
+                logger.error("Не удалось собрать индекс членства, повтор через %.1f с: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def apply(self, event: ChangeEvent) -> None:
+        """Применить событие ленты изменений"""
+        if self._pending is not None:
+            self._pending.append(event)
+
+        student_id = event.student_id
+        if event.type == "student_created":
+            self._students = _with_student(self._students, student_id)
+        elif event.type == "student_deleted":
+            self._students = _without_student(self._students, student_id)
+            for group_id in event.group_ids:
+                if group_id in self._groups:
+                    self._groups[group_id] = _without_student(self._groups[group_id], student_id)
+        elif event.type == "group_created":
+            for group_id in event.group_ids:
+                self._groups.setdefault(group_id, EMPTY)
+        elif event.type == "group_deleted":
+            for group_id in event.group_ids:
+                self._groups.pop(group_id, None)
+        elif event.type == "student_added_to_group":
+            for group_id in event.group_ids:
+                self._groups[group_id] = _with_student(self._groups.get(group_id, EMPTY), student_id)
+        elif event.type == "student_removed_from_group":
+            for group_id in event.group_ids:
+                if group_id in self._groups:
+                    self._groups[group_id] = _without_student(self._groups[group_id], student_id)
+        elif event.type == "student_transferred":
+            from_group_id, to_group_id = event.group_ids
+            if from_group_id in self._groups:
+                self._groups[from_group_id] = _without_student(self._groups[from_group_id], student_id)
+            self._groups[to_group_id] = _with_student(self._groups.get(to_group_id, EMPTY), student_id)
+
+    def _group(self, group_id: int) -> Bitmap:
+        """
+        Карта группы
+
+        Raises:
+            ValueError: Если группа не найдена
+        """
+        bitmap = self._groups.get(group_id)
+        if bitmap is None:
+            raise ValueError(f"Группа с ID {group_id} не найдена")
+        return bitmap
+
+    def query(self, all_of: list[int], any_of: list[int], none_of: list[int]) -> Bitmap:
+        """
+        Студенты, состоящие во всех группах all_of, хотя бы в одной из any_of
+        и ни в одной из none_of
+
+        Raises:
+            RuntimeError: Если индекс ещё не собран
+            ValueError: Если какая-то группа не найдена
+        """
+        if not self.ready:
+            raise RuntimeError("Индекс членства ещё не готов")
+
+        result = None
+        for group_id in all_of:
+            bitmap = self._group(group_id)
+            result = bitmap if result is None else _and(result, bitmap)
+        if any_of:
+            union = EMPTY
+            for group_id in any_of:
+                union = _or(union, self._group(group_id))
+            result = union if result is None else _and(result, union)
+        if result is None:
+            result = self._students
+        for group_id in none_of:
+            result = _and_not(result, self._group(group_id))
+        return result
+
+    @staticmethod
+    def count(bitmap: Bitmap) -> int:
+        """Количество студентов в карте"""
+        return bitmap[1].bit_count()
+
+    @staticmethod
+    def page(bitmap: Bitmap, offset: int, limit: int) -> list[int]:
+        """
+        ID студентов по возрастанию, начиная с offset-го
+
+        Пропускаемая часть не перебирается по битам: сначала целые блоки
+        по PAGE_BLOCK_BYTES, затем 64-битные слова считаются через bit_count()
+        """
+        base, bits = bitmap
+        if limit <= 0 or offset >= bits.bit_count():
+            return []
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+        start = 0
+        while start < len(data):
+            count = int.from_bytes(data[start:start + PAGE_BLOCK_BYTES], "little").bit_count()
+            if count > offset:
+                break
+            offset -= count
+            start += PAGE_BLOCK_BYTES
+
+        ids = []
+        for word_start in range(start, len(data), 8):
+            word = int.from_bytes(data[word_start:word_start + 8], "little")
+            if offset:
+                count = word.bit_count()
+                if count <= offset:
+                    offset -= count
+                    continue
+                for _ in range(offset):
+                    word &= word - 1  # Снять младшую единицу
+                offset = 0
+            while word:
+                lowest = word & -word
+                ids.append(base + word_start * 8 + lowest.bit_length() - 1)
+                if len(ids) == limit:
+                    return ids
+                word ^= lowest
+        return ids
+
+
+# Один индекс на воркер
+membership_index = MembershipIndex()
@@ -2,15 +2,28 @@
 Service Layer - бизнес-логика приложения
 Обрабатывает запросы от API, проверяет условия, вызывает репозитории
 """
-from src.repositories.repositories import StudentRepository, GroupRepository
-from src.schemas.schemas import StudentCreate, GroupCreate
+import base64
+import json
+from datetime import datetime, timedelta
+from src.config import settings
+from src.events.events import ChangePublisher, BufferedPublisher
+from src.repositories.repositories import StudentRepository, GroupRepository, SyncRepository
+from src.schemas.schemas import StudentCreate, GroupCreate, ChangeEvent, BatchOperation, BatchId
+from src.tracing.tracing import traced_methods
 
 
+@traced_methods("service", can_start=True)
 class StudentService:
     """Сервис для работы со студентами"""
 
-    def __init__(self, repository: StudentRepository):
+    def __init__(self, repository: StudentRepository, publisher: ChangePublisher | None = None):
         self.repository = repository
+        self.publisher = publisher
+
+    async def _publish(self, *events: ChangeEvent):
+        """Отправить события в ленту изменений, если она подключена"""
+        if self.publisher is not None:
+            await self.publisher.publish(*events)
 
     async def create_student(self, student_data: StudentCreate):
         """
@@ -22,11 +35,13 @@ class StudentService:
         Returns:
             Созданный студент
         """
-        return await self.repository.create(
+        student = await self.repository.create(
             first_name=student_data.first_name,
             last_name=student_data.last_name,
             email=student_data.email
         )
+        await self._publish(ChangeEvent(type="student_created", student_id=student.id))
+        return student
 
     async def get_student(self, student_id: int):
         """
@@ -46,14 +61,34 @@ class StudentService:
             raise ValueError(f"Студент с ID {student_id} не найден")
         return student
 
-    async def get_all_students(self):
+    async def get_all_students(
+            self,
+            group_id: int | None = None,
+            last_name: str | None = None,
+            email_domain: str | None = None,
+            sort: str = "id"
+    ):
         """
-        Получить всех студентов
+        Получить студентов
+
+        Args:
+            group_id: Только студенты этой группы
+            last_name: Только студенты с этой фамилией
+            email_domain: Только студенты с email в этом домене
+            sort: Поле сортировки, "-" - по убыванию
 
         Returns:
             Список студентов
+
+        Raises:
+            ValueError: Если сортировка не поддерживается
         """
-        return await self.repository.get_all()
+        return await self.repository.get_all(
+            group_id=group_id,
+            last_name=last_name,
+            email_domain=email_domain,
+            sort=sort
+        )
 
     async def delete_student(self, student_id: int):
         """
@@ -68,17 +103,54 @@ class StudentService:
         Raises:
             ValueError: Если студент не найден
         """
-        success = await self.repository.delete(student_id)
-        if not success:
+        group_ids = await self.repository.delete(student_id)
+        if group_ids is None:
             raise ValueError(f"Студент с ID {student_id} не найден")
+        # Группы нужны подписчикам с фильтром: студент пропадает из их состава
+        await self._publish(ChangeEvent(type="student_deleted", student_id=student_id, group_ids=group_ids))
         return {"message": "Студент успешно удален"}
 
+    async def delete_students(self, student_ids: list[int]):
+        """
+        Удалить нескольких студентов одним запросом
 
+        Args:
+            student_ids: ID студентов
+
+        Returns:
+            ID удалённых и не найденных студентов
+
+        Raises:
+            ValueError: Если ни один студент не найден
+        """
+        deleted_groups = await self.repository.delete_many(student_ids)
+        if not deleted_groups:
+            raise ValueError("Ни один из студентов не найден")
+        await self._publish(
+            *(
+                ChangeEvent(type="student_deleted", student_id=student_id, group_ids=group_ids)
+                for student_id, group_ids in deleted_groups.items()
+            )
+        )
+        deleted = set(deleted_groups)
+        return {
+            "deleted": sorted(deleted),
+            "not_found": sorted(set(student_ids) - deleted),
+        }
+
+
+@traced_methods("service", can_start=True)
 class GroupService:
     """Сервис для работы с группами"""
 
-    def __init__(self, repository: GroupRepository):
+    def __init__(self, repository: GroupRepository, publisher: ChangePublisher | None = None):
         self.repository = repository
+        self.publisher = publisher
+
+    async def _publish(self, *events: ChangeEvent):
+        """Отправить события в ленту изменений, если она подключена"""
+        if self.publisher is not None:
+            await self.publisher.publish(*events)
 
     async def create_group(self, group_data: GroupCreate):
         """
@@ -90,10 +162,12 @@ class GroupService:
         Returns:
             Созданная группа
         """
-        return await self.repository.create(
+        group = await self.repository.create(
             name=group_data.name,
             description=group_data.description
         )
+        await self._publish(ChangeEvent(type="group_created", group_ids=[group.id]))
+        return group
 
     async def get_group(self, group_id: int):
         """
@@ -113,14 +187,31 @@ class GroupService:
             raise ValueError(f"Группа с ID {group_id} не найдена")
         return group
 
-    async def get_all_groups(self):
+    async def get_all_groups(
+            self,
+            name_prefix: str | None = None,
+            min_size: int | None = None,
+            sort: str = "id"
+    ):
         """
-        Получить все группы
+        Получить группы
+
+        Args:
+            name_prefix: Только группы с названием, начинающимся с префикса
+            min_size: Только группы не меньше этого размера
+            sort: Поле сортировки, "-" - по убыванию
 
         Returns:
             Список групп
+
+        Raises:
+            ValueError: Если сортировка не поддерживается
         """
-        return await self.repository.get_all()
+        return await self.repository.get_all(
+            name_prefix=name_prefix,
+            min_size=min_size,
+            sort=sort
+        )
 
     async def delete_group(self, group_id: int):
         """
@@ -138,6 +229,7 @@ class GroupService:
         success = await self.repository.delete(group_id)
         if not success:
             raise ValueError(f"Группа с ID {group_id} не найдена")
+        await self._publish(ChangeEvent(type="group_deleted", group_ids=[group_id]))
         return {"message": "Группа успешно удалена"}
 
     async def add_student_to_group(self, student_id: int, group_id: int):
@@ -157,6 +249,9 @@ class GroupService:
         success = await self.repository.add_student_to_group(student_id, group_id)
         if not success:
             raise ValueError("Студент или группа не найдены")
+        await self._publish(
+            ChangeEvent(type="student_added_to_group", student_id=student_id, group_ids=[group_id])
+        )
         return {"message": f"Студент {student_id} добавлен в группу {group_id}"}
 
     async def remove_student_from_group(self, student_id: int, group_id: int):
@@ -176,6 +271,9 @@ class GroupService:
         success = await self.repository.remove_student_from_group(student_id, group_id)
         if not success:
             raise ValueError("Студент не найден в этой группе")
+        await self._publish(
+            ChangeEvent(type="student_removed_from_group", student_id=student_id, group_ids=[group_id])
+        )
         return {"message": f"Студент {student_id} удален из группы {group_id}"}
 
     async def transfer_student(self, student_id: int, from_group_id: int, to_group_id: int):
@@ -194,13 +292,223 @@ class GroupService:
             ValueError: Если операция не удалась
         """
         # Удаляем из старой группы
-        await self.repository.remove_student_from_group(student_id, from_group_id)
+        removed = await self.repository.remove_student_from_group(student_id, from_group_id)
 
         # Добавляем в новую группу
         success = await self.repository.add_student_to_group(student_id, to_group_id)
         if not success:
+            # В памяти удаление из старой группы уже применено, сообщаем о нём подписчикам.
+            # В БД транзакция запроса откатится вместе с этим событием
+            if removed:
+                await self._publish(
+                    ChangeEvent(type="student_removed_from_group", student_id=student_id, group_ids=[from_group_id])
+                )
             raise ValueError("Ошибка при переводе студента")
 
+        await self._publish(
+            ChangeEvent(
+                type="student_transferred",
+                student_id=student_id,
+                group_ids=[from_group_id, to_group_id]
+            )
+        )
         return {
             "message": f"Студент {student_id} переведен из группы {from_group_id} в группу {to_group_id}"
-        }
\ No newline at end of file
+        }
+
+
+@traced_methods("service", can_start=True)
+class BatchService:
+    """
+    Сервис пакетного выполнения операций
+
+    Операции выполняются по порядку через StudentService и GroupService
+    в одной транзакции. События ленты копятся и публикуются
+    одним запросом, только если все операции прошли
+    """
+
+    def __init__(self, transaction, publisher: ChangePublisher | None = None):
+        """
+        Args:
+            transaction: Фабрика контекстного менеджера транзакции, отдающего
+                         пару репозиториев (студентов, групп); откатывает всё при исключении
+            publisher: Публикатор событий после всех операций
+        """
+        self.transaction = transaction
+        self.publisher = publisher
+
+    @staticmethod
+    def _resolve(value: BatchId, refs: dict[str, int]) -> int:
+        """
+        ID из операции: число как есть, строка - ссылка на созданный ранее объект
+
+        Raises:
+            ValueError: Если ссылка не определена в предыдущих операциях
+        """
+        if isinstance(value, int):
+            return value
+        if value not in refs:
+            raise ValueError(f"Ссылка {value} не определена в предыдущих операциях")
+        return refs[value]
+
+    async def _apply(
+            self,
+            operation: BatchOperation,
+            students: StudentService,
+            groups: GroupService,
+            refs: dict[str, int]
+    ) -> dict:
+        """Выполнить одну операцию, вернуть её результат"""
+        op = operation.op
+        if op in ("create_student", "create_group"):
+            if operation.ref is not None and operation.ref in refs:
+                raise ValueError(f"Ссылка {operation.ref} уже определена")
+            if op == "create_student":
+                created = await students.create_student(operation)
+            else:
+                created = await groups.create_group(operation)
+            if operation.ref is not None:
+                refs[operation.ref] = created.id
+            return {"op": op, "id": created.id}
+
+        if op == "delete_student":
+            await students.delete_student(self._resolve(operation.student_id, refs))
+        elif op == "delete_group":
+            await groups.delete_group(self._resolve(operation.group_id, refs))
+        elif op == "add_student_to_group":
+            await groups.add_student_to_group(
+                self._resolve(operation.student_id, refs), self._resolve(operation.group_id, refs)
+            )
+        elif op == "remove_student_from_group":
+            await groups.remove_student_from_group(
+                self._resolve(operation.student_id, refs), self._resolve(operation.group_id, refs)
+            )
+        elif op == "transfer_student":
+            await groups.transfer_student(
+                self._resolve(operation.student_id, refs),
+                self._resolve(operation.from_group_id, refs),
+                self._resolve(operation.to_group_id, refs)
+            )
+        return {"op": op}
+
+    async def execute(self, operations: list[BatchOperation]):
+        """
+        Выполнить пакет операций: либо все, либо ни одной
+
+        Args:
+            operations: Операции в порядке выполнения
+
+        Returns:
+            Результаты операций в том же порядке
+
+        Raises:
+            ValueError: Если какая-то операция не удалась (с её номером), пакет откатывается
+        """
+        events = BufferedPublisher()
+        refs: dict[str, int] = {}
+        results = []
+        async with self.transaction() as (student_repository, group_repository):
+            students = StudentService(student_repository, events)
+            groups = GroupService(group_repository, events)
+            for index, operation in enumerate(operations):
+                try:
+                    results.append(await self._apply(operation, students, groups, refs))
+                except Exception as e:
+                    # Ошибки БД (например, нарушение уникальности) тоже откатывают пакет
+                    raise ValueError(f"Операция {index} ({operation.op}): {e}") from e
+
+        if self.publisher is not None:
+            await self.publisher.publish(*events.events)
+        return {"results": results}
+
+
+@traced_methods("service", can_start=True)
+class SyncService:
+    """
+    Сервис инкрементальной синхронизации
+
+    Watermark - непрозрачная для клиента строка с курсорами
+    всех четырёх потоков изменений
+    """
+
+    # Потоки изменений и длина курсора каждого (время изменения + ключ)
+    CURSOR_SIZES = {"students": 2, "groups": 2, "memberships": 3, "tombstones": 2}
+
+    def __init__(self, repository: SyncRepository):
+        self.repository = repository
+
+    @classmethod
+    def _decode_watermark(cls, watermark: str | None) -> dict[str, tuple]:
+        """
+        Разобрать watermark в курсоры потоков
+
+        Raises:
+            ValueError: Если watermark повреждён
+        """
+        if not watermark:
+            return {}
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(watermark + "=" * (-len(watermark) % 4)))
+            cursors = {}
+            for stream, cursor in raw.items():
+                # Курсор: время изменения и столько ключей, сколько у потока
+                if len(cursor) != cls.CURSOR_SIZES[stream]:
+                    raise ValueError
+                changed_at = datetime.fromisoformat(cursor[0])
+                if changed_at.tzinfo is None:
+                    raise ValueError
+                keys = tuple(int(key) for key in cursor[1:])
+                # Ключи - ID из колонок integer
+                if not all(0 <= key < 2 ** 31 for key in keys):
+                    raise ValueError
+                cursors[stream] = (changed_at, *keys)
+            return cursors
+        except (ValueError, TypeError, AttributeError, KeyError):
+            raise ValueError("Некорректный watermark")
+
+    @staticmethod
+    def _encode_watermark(cursors: dict[str, tuple]) -> str:
+        """Упаковать курсоры потоков в watermark"""
+        raw = {stream: [cursor[0].isoformat(), *cursor[1:]] for stream, cursor in cursors.items()}
+        return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode()).decode().rstrip("=")
+
+    async def get_changes(self, since: str | None, limit: int):
+        """
+        Получить изменения после watermark
+
+        Args:
+            since: Watermark из предыдущего ответа (None - полная выгрузка)
+            limit: Максимум записей в каждом потоке
+
+        Returns:
+            Изменения, новый watermark и признак наличия следующей страницы
+
+        Raises:
+            ValueError: Если watermark повреждён
+        """
+        cursors = self._decode_watermark(since)
+        lag = timedelta(seconds=settings.SYNC_SAFETY_LAG)
+
+        students = await self.repository.students_since(cursors.get("students"), limit, lag)
+        groups = await self.repository.groups_since(cursors.get("groups"), limit, lag)
+        memberships = await self.repository.memberships_since(cursors.get("memberships"), limit, lag)
+        tombstones = await self.repository.tombstones_since(cursors.get("tombstones"), limit, lag)
+
+        # Курсор потока сдвигается на последнюю выданную запись
+        if students:
+            cursors["students"] = (students[-1].updated_at, students[-1].id)
+        if groups:
+            cursors["groups"] = (groups[-1].updated_at, groups[-1].id)
+        if memberships:
+            cursors["memberships"] = (memberships[-1].updated_at, memberships[-1].student_id, memberships[-1].group_id)
+        if tombstones:
+            cursors["tombstones"] = (tombstones[-1].deleted_at, tombstones[-1].id)
+
+        return {
+            "students": students,
+            "groups": groups,
+            "memberships": memberships,
+            "tombstones": tombstones,
+            "watermark": self._encode_watermark(cursors),
+            "has_more": any(len(rows) == limit for rows in (students, groups, memberships, tombstones)),
+        }
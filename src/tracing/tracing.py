@@ -0,0 +1,325 @@
+"""
+Трассировка запросов по слоям.
+Открывает span на каждом слое (HTTP, роутер, зависимости, сервисы, репозитории, SQL)
+и выгружает их в формате Chrome Trace Event: файл открывается в Perfetto или chrome://tracing
+"""
+import functools
+import inspect
+import itertools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.config import settings
+
+# Сдвиг perf_counter относительно unix-времени, чтобы метки были и точными, и абсолютными
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+_ids = itertools.count(1)
+
+# Значение в контексте, когда корень решил не записывать трассу:
+# вложенные span с can_start не начинают новую трассу и не переигрывают выборку
+_UNSAMPLED = object()
+
+
+class Span:
+    """Один участок трассы"""
+    __slots__ = ("layer", "name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "trace")
+
+    def __init__(self, layer: str, name: str, parent: "Span | None", attributes: dict):
+        self.layer = layer
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        # Все span одной трассы копятся в общем списке и выгружаются вместе с корнем
+        self.trace: list[Span] = parent.trace if parent else []
+        self.attributes = attributes
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: int | None = None
+
+    def to_event(self) -> dict:
+        """Событие формата Chrome Trace Event ("X" - завершённый участок)"""
+        return {
+            "name": self.name,
+            "cat": self.layer,
+            "ph": "X",
+            "ts": (self.start_ns + _EPOCH_OFFSET_NS) / 1000,
+            "dur": (self.end_ns - self.start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": self.trace_id,
+            "args": {"span_id": self.span_id, "parent_id": self.parent_id, **self.attributes},
+        }
+
+
+class InMemoryExporter:
+    """Хранит последние события в памяти (для тестов и бенчмарков)"""
+
+    def __init__(self, max_events: int):
+        self.events: deque[dict] = deque(maxlen=max_events)
+
+    def export(self, spans: list[Span]) -> None:
+        self.events.extend(span.to_event() for span in spans)
+
+
+class FileExporter:
+    """
+    Дописывает события в файл в формате JSON Array
+
+    Запись и flush идут в фоновом потоке, чтобы не блокировать цикл событий:
+    export только кладёт трассу в очередь. Если поток не успевает,
+    новые трассы отбрасываются (счётчик dropped).
+    Закрывающая скобка массива в этом формате необязательна,
+    поэтому файл можно читать, не останавливая приложение
+    """
+
+    def __init__(self, path: str, queue_size: int = 10_000):
+        self.path = path
+        self.dropped = 0  # Сколько трасс отброшено из-за переполнения очереди
+        self._queue: queue.Queue[list[Span] | None] = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        """Фоновый поток: забрать накопившиеся трассы, записать их и сбросить файл одним flush"""
+        with open(self.path, "a", encoding="utf-8") as file:
+            if file.tell() == 0:
+                file.write("[\n")
+            while True:
+                batch = [self._queue.get()]
+                while not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                stop = None in batch
+                file.write("".join(
+                    json.dumps(span.to_event(), ensure_ascii=False) + ",\n"
+                    for spans in batch if spans is not None
+                    for span in spans
+                ))
+                file.flush()
+                if stop:
+                    return
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Дописать очередь и остановить фоновый поток"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+class Tracer:
+    """
+    Создание span и выборка трасс
+
+    Решение о записи трассы принимается один раз, на корневом span,
+    дальше все вложенные span пишутся или не пишутся вместе с ним.
+    Отказ тоже запоминается в контексте, поэтому span с can_start ниже по стеку
+    начинают трассу, только если решения ещё нет (например, сервис вызван напрямую)
+    """
+
+    def __init__(self, exporter, sample_rate: float):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+    @property
+    def active(self) -> bool:
+        """Записывается ли сейчас трасса"""
+        current = self._current.get()
+        return current is not None and current is not _UNSAMPLED
+
+    def start(self, layer: str, name: str, can_start: bool = False, **attributes) -> tuple[Span | None, object]:
+        """
+        Открыть span, вернуть его и токен для finish
+
+        Args:
+            layer: Слой (http, router, dependency, endpoint, service, repository, sql)
+            name: Название участка
+            can_start: Может ли span начать новую трассу (только точки входа)
+        """
+        parent = self._current.get()
+        if parent is _UNSAMPLED:
+            return None, None
+        if parent is None:
+            if not can_start or self.exporter is None:
+                return None, None
+            if random.random() >= self.sample_rate:
+                # Запомнить отказ до конца корневого span
+                return None, self._current.set(_UNSAMPLED)
+        span = Span(layer, name, parent, attributes)
+        return span, self._current.set(span)
+
+    def close(self) -> None:
+        """Остановить выгрузку (у FileExporter - дописать очередь в файл)"""
+        close = getattr(self.exporter, "close", None)
+        if close is not None:
+            close()
+
+    def finish(self, span: Span | None, token, error: BaseException | None = None) -> None:
+        """Закрыть span, для корневого - выгрузить всю трассу"""
+        if span is None:
+            if token is not None:
+                self._current.reset(token)
+            return
+        span.end_ns = time.perf_counter_ns()
+        if error is not None:
+            span.attributes["error"] = type(error).__name__
+        span.trace.append(span)
+        self._current.reset(token)
+        if span.parent_id is None:
+            self.exporter.export(span.trace)
+
+    @contextmanager
+    def span(self, layer: str, name: str, can_start: bool = False, **attributes):
+        """Span на время блока with"""
+        span, token = self.start(layer, name, can_start, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self.finish(span, token, e)
+            raise
+        self.finish(span, token)
+
+
+def _create_exporter():
+    if settings.TRACING_EXPORTER == "file":
+        return FileExporter(settings.TRACING_FILE)
+    if settings.TRACING_EXPORTER == "memory":
+        return InMemoryExporter(settings.TRACING_MEMORY_EVENTS)
+    return None
+
+
+# Один трассировщик на процесс
+tracer = Tracer(_create_exporter(), settings.TRACING_SAMPLE_RATE)
+
+
+def traced(layer: str, name: str | None = None, can_start: bool = False):
+    """
+    Декоратор async-функции: вызов оборачивается в span
+
+    Сигнатура сохраняется (functools.wraps), поэтому декоратор
+    можно вешать на эндпоинты и зависимости FastAPI
+    """
+    def decorator(func):
+        # Маршрут пересоздаётся при include_router, повторно оборачивать не нужно
+        if getattr(func, "__traced__", False):
+            return func
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Без активной трассы вложенный span не нужен, лишняя работа не делается
+            if not tracer.active and (not can_start or tracer.exporter is None):
+                return await func(*args, **kwargs)
+            with tracer.span(layer, span_name, can_start):
+                return await func(*args, **kwargs)
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    return decorator
+
+
+def traced_methods(layer: str, can_start: bool = False):
+    """Декоратор класса: все публичные async-методы оборачиваются в span"""
+    def decorator(cls):
+        for attr_name, attr in list(vars(cls).items()):
+            if not attr_name.startswith("_") and inspect.iscoroutinefunction(attr):
+                setattr(cls, attr_name, traced(layer, f"{cls.__name__}.{attr_name}", can_start)(attr))
+        return cls
+
+    return decorator
+
+
+class TracedRoute(APIRoute):
+    """
+    Маршрут с трассировкой
+
+    Span роутера охватывает зависимости, эндпоинт и сериализацию ответа:
+    время, не покрытое вложенными span, - это валидация и сериализация pydantic
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, traced("endpoint")(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        name = f"{','.join(sorted(self.methods))} {self.path_format}"
+
+        async def traced_handler(request):
+            with tracer.span("router", name, can_start=True):
+                return await handler(request)
+
+        return traced_handler
+
+
+class TracingMiddleware:
+    """Корневой span на весь HTTP-запрос, включая middleware (например, сжатие)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or tracer.exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        with tracer.span("http", f"{scope['method']} {scope['path']}", can_start=True) as span:
+            async def send_wrapper(message: Message) -> None:
+                if span is not None and message["type"] == "http.response.start":
+                    span.attributes["status"] = message["status"]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Span на каждый SQL-запрос через события движка
+
+    Синхронные события SQLAlchemy выполняются в greenlet с контекстом
+    вызывающей корутины, поэтому span попадает в трассу запроса
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not tracer.active:
+            return
+        span, token = tracer.start("sql", statement.split(None, 1)[0].upper(), statement=statement[:1000])
+        conn.info.setdefault("trace_spans", []).append((span, token))
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            tracer.finish(*spans.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+        if spans:
+            span, token = spans.pop()
+            tracer.finish(span, token, exception_context.original_exception)
@@ -0,0 +1,26 @@
+"""
+Общие фикстуры тестов.
+Тесты идут на хранилище в памяти (STORAGE_BACKEND=memory), PostgreSQL не нужен
+"""
+import os
+
+# Настройки читаются при импорте src.config, поэтому задаются до импорта приложения
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["SYNC_SAFETY_LAG"] = "0"
+os.environ["TRACING_EXPORTER"] = "none"
+for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+    os.environ.setdefault(name, "test")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from src.repositories.memory import memory_storage
+
+
+@pytest.fixture
+def client():
+    """Клиент приложения с пустым хранилищем"""
+    memory_storage.__init__()
+    with TestClient(app) as client:
+        yield client
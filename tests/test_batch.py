@@ -0,0 +1,66 @@
+"""
+Тесты POST /batch: операции применяются все или ни одной
+"""
+from src.events.events import broker
+
+
+def snapshot(client) -> tuple:
+    """Состояние, видимое клиентам: списки, индекс членства и лента синхронизации"""
+    sync = client.get("/api/v1/sync").json()
+    return (
+        client.get("/api/v1/students").json(),
+        client.get("/api/v1/groups").json(),
+        client.get("/api/v1/groups/query").json()["student_ids"],
+        [sync[stream] for stream in ("students", "groups", "memberships", "tombstones")],
+    )
+
+
+def test_batch_applies_all_operations(client):
+    response = client.post("/api/v1/batch", json={"operations": [
+        {"op": "create_group", "name": "A", "ref": "a"},
+        {"op": "create_group", "name": "B", "ref": "b"},
+        {"op": "create_student", "first_name": "S", "last_name": "T", "email": "s@example.com", "ref": "s"},
+        {"op": "add_student_to_group", "student_id": "s", "group_id": "a"},
+        {"op": "transfer_student", "student_id": "s", "from_group_id": "a", "to_group_id": "b"},
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    group_b, student = results[1]["id"], results[2]["id"]
+
+    groups = client.get(f"/api/v1/students/{student}").json()["groups"]
+    assert [group["id"] for group in groups] == [group_b]
+    assert client.get("/api/v1/groups/query", params={"all": [group_b]}).json()["student_ids"] == [student]
+
+
+def test_failed_batch_rolls_back_everything(client):
+    client.post("/api/v1/students", json={"first_name": "Old", "last_name": "T", "email": "old@example.com"})
+    client.post("/api/v1/groups", json={"name": "Old"})
+    before = snapshot(client)
+
+    subscription = broker.subscribe()
+    try:
+        response = client.post("/api/v1/batch", json={"operations": [
+            {"op": "create_group", "name": "A", "ref": "a"},
+            {"op": "create_student", "first_name": "S", "last_name": "T", "email": "s@example.com", "ref": "s"},
+            {"op": "add_student_to_group", "student_id": "s", "group_id": "a"},
+            {"op": "delete_student", "student_id": 1},
+            # Последняя операция падает: email уже занят
+            {"op": "create_student", "first_name": "S", "last_name": "T", "email": "s@example.com"},
+        ]})
+    finally:
+        broker.unsubscribe(subscription)
+
+    assert response.status_code == 400
+    assert snapshot(client) == before
+    # События отменённого пакета не публикуются
+    assert subscription.queue.empty()
+
+
+def test_unknown_ref_rolls_back(client):
+    before = snapshot(client)
+    response = client.post("/api/v1/batch", json={"operations": [
+        {"op": "create_group", "name": "A", "ref": "a"},
+        {"op": "add_student_to_group", "student_id": "missing", "group_id": "a"},
+    ]})
+    assert response.status_code == 400
+    assert snapshot(client) == before
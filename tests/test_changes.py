@@ -0,0 +1,35 @@
+"""
+Тесты ленты изменений: подписка SSE живёт ровно столько, сколько поток
+"""
+import asyncio
+
+from src.api.routers.changes import stream_changes
+from src.events.events import broker
+from src.schemas.schemas import ChangeEvent
+
+
+def test_sse_subscribes_only_while_streaming():
+    async def run():
+        subscriptions = len(broker._subscriptions)
+
+        # Клиент ушёл до начала ответа: генератор не запускался, подписки нет
+        response = await stream_changes(group_id=[1])
+        assert len(broker._subscriptions) == subscriptions
+        await response.body_iterator.aclose()
+
+        response = await stream_changes(group_id=[1])
+        first = asyncio.create_task(anext(response.body_iterator))
+        await asyncio.sleep(0)
+        assert len(broker._subscriptions) == subscriptions + 1
+
+        broker.dispatch(ChangeEvent(type="student_added_to_group", student_id=5, group_ids=[2]))
+        broker.dispatch(ChangeEvent(type="student_added_to_group", student_id=7, group_ids=[1]))
+        message = await asyncio.wait_for(first, 1)
+        assert message.startswith("event: student_added_to_group\n")
+        assert '"student_id":7' in message
+
+        # Отключение клиента закрывает генератор и снимает подписку
+        await response.body_iterator.aclose()
+        assert len(broker._subscriptions) == subscriptions
+
+    asyncio.run(run())
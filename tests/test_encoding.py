@@ -0,0 +1,80 @@
+"""
+Тесты согласования формата (JSON/MessagePack) и сжатия ответов
+"""
+import asyncio
+
+import msgpack
+from starlette.responses import StreamingResponse
+
+from src.api.encoding import EncodingMiddleware
+from src.config import settings
+
+
+def create_students(client, first: int, last: int) -> None:
+    for i in range(first, last):
+        client.post(
+            "/api/v1/students",
+            json={"first_name": "Student", "last_name": f"Number{i}", "email": f"student{i}@example.com"}
+        )
+
+
+def test_msgpack_is_negotiated_by_accept(client):
+    create_students(client, 0, 2)
+
+    response = client.get("/api/v1/students", headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert "Accept" in response.headers["vary"]
+    assert msgpack.unpackb(response.content) == client.get("/api/v1/students").json()
+
+    # JSON предпочтительнее при равном q и по умолчанию
+    response = client.get("/api/v1/students", headers={"Accept": "application/json, application/msgpack;q=0.5"})
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_compression_threshold(client):
+    create_students(client, 0, 1)
+    small = client.get("/api/v1/students", headers={"Accept-Encoding": "gzip"})
+    assert len(small.content) < settings.COMPRESSION_MINIMUM_SIZE
+    assert "content-encoding" not in small.headers
+
+    create_students(client, 1, 51)
+    large = client.get("/api/v1/students", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in large.headers["vary"]
+    assert int(large.headers["content-length"]) < len(large.content)
+    assert len(large.json()) == 51
+
+    identity = client.get("/api/v1/students", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+
+def test_event_stream_headers_are_not_held():
+    """Заголовки SSE уходят до первого события, а не вместе с ним"""
+    first_event = asyncio.Event()
+
+    async def events():
+        await first_event.wait()
+        yield b"data: 1\n\n"
+
+    async def run() -> list[str]:
+        sent = []
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message["type"])
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/", "query_string": b"",
+            "headers": [(b"accept-encoding", b"gzip, br")],
+        }
+        app = EncodingMiddleware(StreamingResponse(events(), media_type="text/event-stream"))
+        task = asyncio.create_task(app(scope, receive, send))
+        await asyncio.sleep(0.05)
+        before_event = list(sent)
+        first_event.set()
+        await asyncio.wait_for(task, 1)
+        return before_event
+
+    assert asyncio.run(run()) == ["http.response.start"]
@@ -0,0 +1,34 @@
+"""
+Тесты эндпоинтов групп: фильтры и сортировка списка
+"""
+
+
+def test_group_filters_and_sort(client):
+    names = ["CS-2", "MATH-1", "CS-1", "cs-3"]
+    group_ids = {name: client.post("/api/v1/groups", json={"name": name}).json()["id"] for name in names}
+    for i in range(3):
+        student_id = client.post(
+            "/api/v1/students", json={"first_name": "S", "last_name": str(i), "email": f"s{i}@example.com"}
+        ).json()["id"]
+        client.post("/api/v1/groups/add-student", json={"student_id": student_id, "group_id": group_ids["CS-1"]})
+        if i < 2:
+            client.post("/api/v1/groups/add-student", json={"student_id": student_id, "group_id": group_ids["MATH-1"]})
+
+    def names_of(**params) -> list[str]:
+        response = client.get("/api/v1/groups", params=params)
+        assert response.status_code == 200
+        return [group["name"] for group in response.json()]
+
+    assert names_of() == names
+    assert names_of(sort="name", min_size=1) == ["CS-1", "MATH-1"]
+    assert names_of(sort="-name", name_prefix="CS-") == ["CS-2", "CS-1"]
+    # Префикс учитывает регистр, как LIKE 'CS-%'
+    assert names_of(name_prefix="CS-") == ["CS-2", "CS-1"]
+    assert names_of(min_size=2) == ["MATH-1", "CS-1"]
+    assert names_of(min_size=3, name_prefix="CS-") == ["CS-1"]
+    assert names_of(min_size=0) == names
+
+
+def test_group_sort_is_allow_listed(client):
+    assert client.get("/api/v1/groups", params={"sort": "description"}).status_code == 422
+    assert client.get("/api/v1/groups", params={"min_size": -1}).status_code == 422
@@ -0,0 +1,105 @@
+"""
+Тесты /livez, /readyz и фоновой проверки БД
+"""
+import asyncio
+
+from src.database.health import DatabaseProber, prober
+
+
+def test_livez(client):
+    response = client.get("/livez")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+
+def test_readyz_on_memory_backend(client):
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert response.json()["database"] == "in-memory"
+
+
+def test_readyz_is_503_until_warmed_up(client, monkeypatch):
+    monkeypatch.setattr(prober, "warmed_up", False)
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["warmup"]["done"] is False
+    # Liveness от готовности не зависит
+    assert client.get("/livez").status_code == 200
+
+
+class FakeConnection:
+    """Соединение asyncpg, отвечающее на SELECT 1 или падающее"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.closed = False
+        self.queries = 0
+
+    async def fetchval(self, query: str):
+        if self.fail:
+            raise ConnectionError("connection lost")
+        self.queries += 1
+        return 1
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def close(self, timeout=None):
+        self.closed = True
+
+
+class SaturatedPool:
+    """Пул, все соединения которого заняты запросами"""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def checkedout(self) -> int:
+        return self.size
+
+    def connect(self):
+        raise AssertionError("проверка не должна брать соединение из пула")
+
+
+class FakeEngine:
+    def __init__(self, pool):
+        self.pool = pool
+
+
+def make_prober(connections: list[FakeConnection]) -> DatabaseProber:
+    test_prober = DatabaseProber(FakeEngine(SaturatedPool(15)), interval=1, timeout=1, pool_capacity=15)
+    test_prober.warmed_up = True
+
+    async def connect():
+        return connections.pop(0)
+
+    test_prober._connect = connect
+    return test_prober
+
+
+def test_probe_does_not_use_the_pool():
+    connection = FakeConnection()
+    test_prober = make_prober([connection])
+
+    asyncio.run(test_prober.probe())
+    asyncio.run(test_prober.probe())
+
+    # Полный пул - метрика, а не отказ; соединение проверок переиспользуется
+    assert test_prober.is_ready
+    assert connection.queries == 2
+    assert test_prober.status()["pool"] == {"checked_out": 15, "capacity": 15, "saturation": 1.0}
+
+
+def test_probe_reconnects_after_failure():
+    broken, fresh = FakeConnection(fail=True), FakeConnection()
+    test_prober = make_prober([broken, fresh])
+
+    asyncio.run(test_prober.probe())
+    assert not test_prober.is_ready
+    assert test_prober.status()["database"] == "error: connection lost"
+    assert broken.closed
+
+    asyncio.run(test_prober.probe())
+    assert test_prober.is_ready
+    assert fresh.queries == 1
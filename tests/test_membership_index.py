@@ -0,0 +1,100 @@
+"""
+Тесты битовых карт индекса членства: операции над множествами и постраничная выдача
+сверяются с теми же операциями над set
+"""
+import random
+
+import pytest
+
+from src.services.membership_index import (
+    EMPTY, PAGE_BLOCK_BYTES, MembershipIndex, _and, _and_not, _bitmap_from_ids, _or,
+    _with_student, _without_student,
+)
+
+
+def ids_of(bitmap) -> list[int]:
+    """Все ID карты по возрастанию"""
+    return MembershipIndex.page(bitmap, 0, MembershipIndex.count(bitmap) + 1)
+
+
+def random_ids(rng: random.Random, low: int, high: int, size: int) -> set[int]:
+    return set(rng.sample(range(low, high), size))
+
+
+# Пары множеств с разными смещениями: пересекающиеся, вложенные, разнесённые, пустые
+CASES = [
+    ((1, 1000, 300), (500, 2000, 300)),
+    ((1, 200_000, 5000), (70_000, 90_000, 2000)),
+    ((10_000, 20_000, 100), (1, 64, 10)),
+    ((1, 100, 0), (1, 100, 50)),
+    ((1, 100, 50), (1, 100, 0)),
+]
+
+
+@pytest.mark.parametrize("left_spec,right_spec", CASES)
+def test_set_algebra_matches_sets(left_spec, right_spec):
+    rng = random.Random(42)
+    left, right = random_ids(rng, *left_spec), random_ids(rng, *right_spec)
+    left_bitmap, right_bitmap = _bitmap_from_ids(list(left)), _bitmap_from_ids(list(right))
+
+    assert ids_of(_and(left_bitmap, right_bitmap)) == sorted(left & right)
+    assert ids_of(_or(left_bitmap, right_bitmap)) == sorted(left | right)
+    assert ids_of(_and_not(left_bitmap, right_bitmap)) == sorted(left - right)
+    assert ids_of(_and_not(right_bitmap, left_bitmap)) == sorted(right - left)
+
+
+def test_empty_results_are_normalized():
+    bitmap = _bitmap_from_ids([1, 2, 3])
+    assert _and(bitmap, _bitmap_from_ids([100])) == EMPTY
+    assert _and_not(bitmap, bitmap) == EMPTY
+    assert _without_student(_bitmap_from_ids([5]), 5) == EMPTY
+
+
+def test_with_and_without_student():
+    bitmap = _bitmap_from_ids([1000, 1001])
+    # Студент левее смещения сдвигает карту
+    bitmap = _with_student(bitmap, 3)
+    bitmap = _with_student(bitmap, 5000)
+    assert ids_of(bitmap) == [3, 1000, 1001, 5000]
+    bitmap = _without_student(bitmap, 1000)
+    assert _without_student(bitmap, 2) == bitmap
+    assert ids_of(bitmap) == [3, 1001, 5000]
+
+
+def test_page_matches_sorted_slice():
+    rng = random.Random(7)
+    # Больше нескольких блоков PAGE_BLOCK_BYTES, с пустыми участками
+    ids = random_ids(rng, 1, PAGE_BLOCK_BYTES * 8 * 3, 20_000) | set(range(400_000, 400_100))
+    bitmap = _bitmap_from_ids(list(ids))
+    expected = sorted(ids)
+    for offset in (0, 1, 63, 64, 65, 9_999, 19_999, 20_000, 20_050, len(expected) - 1):
+        for limit in (1, 7, 100, 5000):
+            assert MembershipIndex.page(bitmap, offset, limit) == expected[offset:offset + limit]
+
+
+def test_page_edges():
+    bitmap = _bitmap_from_ids([64, 65, 130])
+    assert MembershipIndex.page(bitmap, 3, 10) == []
+    assert MembershipIndex.page(bitmap, 10 ** 9, 10) == []
+    assert MembershipIndex.page(bitmap, 0, 0) == []
+    assert MembershipIndex.page(EMPTY, 0, 10) == []
+
+
+def test_query_endpoint(client):
+    """all/any/none в GET /groups/query поверх индекса, который ведут события ленты"""
+    a, b, c = (client.post("/api/v1/groups", json={"name": name}).json()["id"] for name in ("A", "B", "C"))
+    students = [
+        client.post(
+            "/api/v1/students", json={"first_name": "S", "last_name": str(i), "email": f"s{i}@example.com"}
+        ).json()["id"]
+        for i in range(5)
+    ]
+    members = {a: students[:4], b: students[2:], c: students[3:4]}
+    for group_id, student_ids in members.items():
+        for student_id in student_ids:
+            response = client.post("/api/v1/groups/add-student", json={"student_id": student_id, "group_id": group_id})
+            assert response.status_code == 200
+
+    response = client.get("/api/v1/groups/query", params={"all": [a], "any": [b], "none": [c]})
+    assert response.status_code == 200
+    assert response.json()["student_ids"] == [students[2]]
@@ -0,0 +1,59 @@
+"""
+Тесты эндпоинтов студентов
+"""
+
+
+def create_student(client, first_name: str, last_name: str, email: str) -> int:
+    response = client.post("/api/v1/students", json={"first_name": first_name, "last_name": last_name, "email": email})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_delete_many_splits_deleted_and_not_found(client):
+    ids = [create_student(client, "S", str(i), f"s{i}@example.com") for i in range(3)]
+    group_id = client.post("/api/v1/groups", json={"name": "A"}).json()["id"]
+    client.post("/api/v1/groups/add-student", json={"student_id": ids[0], "group_id": group_id})
+
+    response = client.delete("/api/v1/students", params={"ids": [ids[0], ids[1], 999, ids[0]]})
+    assert response.status_code == 200
+    assert response.json() == {"deleted": [ids[0], ids[1]], "not_found": [999]}
+
+    assert [student["id"] for student in client.get("/api/v1/students").json()] == [ids[2]]
+    # Связи удалённых студентов удаляются вместе с ними
+    assert client.get(f"/api/v1/groups/{group_id}").json()["students"] == []
+    tombstones = client.get("/api/v1/sync").json()["tombstones"]
+    assert sorted(t["entity_id"] for t in tombstones if t["entity"] == "student") == [ids[0], ids[1]]
+
+
+def test_delete_many_when_nothing_found(client):
+    assert client.delete("/api/v1/students", params={"ids": [1, 2]}).status_code == 404
+    assert client.delete("/api/v1/students").status_code == 422
+
+
+def test_student_filters_and_sort(client):
+    ivanov = create_student(client, "Пётр", "Иванов", "petr@Example.com")
+    abramov = create_student(client, "Анна", "Абрамов", "anna@mail.org")
+    ivanova = create_student(client, "Анна", "Иванов", "anna@example.com")
+    group_id = client.post("/api/v1/groups", json={"name": "A"}).json()["id"]
+    client.post("/api/v1/groups/add-student", json={"student_id": abramov, "group_id": group_id})
+
+    def ids(**params) -> list[int]:
+        response = client.get("/api/v1/students", params=params)
+        assert response.status_code == 200
+        return [student["id"] for student in response.json()]
+
+    assert ids() == [ivanov, abramov, ivanova]
+    assert ids(sort="-id") == [ivanova, abramov, ivanov]
+    # По фамилии, затем по имени
+    assert ids(sort="last_name") == [abramov, ivanova, ivanov]
+    assert ids(sort="email") == [ivanova, abramov, ivanov]
+    assert ids(last_name="Иванов") == [ivanov, ivanova]
+    # Домен сравнивается без учёта регистра
+    assert ids(email_domain="EXAMPLE.com") == [ivanov, ivanova]
+    assert ids(group_id=group_id) == [abramov]
+    assert ids(last_name="Иванов", email_domain="mail.org") == []
+
+
+def test_student_sort_is_allow_listed(client):
+    assert client.get("/api/v1/students", params={"sort": "first_name"}).status_code == 422
+    assert client.get("/api/v1/students", params={"sort": "id; DROP TABLE students"}).status_code == 422
@@ -0,0 +1,82 @@
+"""
+Тесты GET /sync: упаковка watermark, проверка повреждённых watermark и постраничная выдача
+"""
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from src.services.services import SyncService
+
+
+def make_watermark(raw) -> str:
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+
+def test_watermark_round_trip():
+    changed_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursors = {
+        "students": (changed_at, 10),
+        "groups": (changed_at, 2),
+        "memberships": (changed_at, 10, 2),
+        "tombstones": (changed_at, 7),
+    }
+    watermark = SyncService._encode_watermark(cursors)
+    assert "=" not in watermark
+    assert SyncService._decode_watermark(watermark) == cursors
+    assert SyncService._decode_watermark(None) == {}
+    assert SyncService._decode_watermark("") == {}
+
+
+NOW = "2024-05-01T12:00:00+00:00"
+
+
+@pytest.mark.parametrize("watermark", [
+    "не base64",
+    make_watermark([NOW, 1]),
+    make_watermark({"teachers": [NOW, 1]}),
+    make_watermark({"students": [NOW]}),
+    make_watermark({"students": [NOW, 1, 2]}),
+    make_watermark({"memberships": [NOW, 1]}),
+    make_watermark({"students": ["2024-05-01T12:00:00", 1]}),
+    make_watermark({"students": ["вчера", 1]}),
+    make_watermark({"students": [NOW, "abc"]}),
+    make_watermark({"students": [NOW, -1]}),
+    make_watermark({"students": [NOW, 2 ** 31]}),
+    make_watermark({"students": [NOW, None]}),
+])
+def test_invalid_watermark_is_rejected(client, watermark):
+    with pytest.raises(ValueError):
+        SyncService._decode_watermark(watermark)
+    response = client.get("/api/v1/sync", params={"since": watermark})
+    assert response.status_code == 400
+
+
+def test_paging_returns_every_change_once(client):
+    created = [
+        client.post(
+            "/api/v1/students", json={"first_name": "S", "last_name": str(i), "email": f"sync{i}@example.com"}
+        ).json()["id"]
+        for i in range(5)
+    ]
+
+    seen, pages, since = [], [], None
+    while True:
+        params = {"limit": 2} if since is None else {"limit": 2, "since": since}
+        page = client.get("/api/v1/sync", params=params).json()
+        seen.extend(student["id"] for student in page["students"])
+        pages.append(len(page["students"]))
+        since = page["watermark"]
+        if not page["has_more"]:
+            break
+    assert pages == [2, 2, 1]
+    assert seen == created
+
+    # Повтор с последним watermark ничего не возвращает, удаление приходит в tombstones
+    page = client.get("/api/v1/sync", params={"since": since}).json()
+    assert page["students"] == [] and page["tombstones"] == []
+    assert client.delete(f"/api/v1/students/{created[0]}").status_code == 200
+    page = client.get("/api/v1/sync", params={"since": since}).json()
+    assert page["students"] == []
+    assert [(t["entity"], t["entity_id"]) for t in page["tombstones"]] == [("student", created[0])]
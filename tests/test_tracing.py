@@ -0,0 +1,86 @@
+"""
+Тесты трассировки: вложенность span по слоям и выборка трасс на корне
+"""
+import asyncio
+import random
+
+import pytest
+
+from src.repositories.memory import InMemoryStudentRepository, memory_storage
+from src.services.services import StudentService
+from src.tracing.tracing import InMemoryExporter, tracer
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    """Трассировщик процесса пишет в память"""
+    exporter = InMemoryExporter(100_000)
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    return exporter
+
+
+def traces(exporter) -> dict[int, list[dict]]:
+    """События, сгруппированные по трассам"""
+    grouped = {}
+    for event in exporter.events:
+        grouped.setdefault(event["tid"], []).append(event)
+    return grouped
+
+
+def test_spans_nest_by_layer(client, exporter):
+    client.post("/api/v1/groups", json={"name": "A"})
+    exporter.events.clear()
+
+    assert client.get("/api/v1/groups").status_code == 200
+    [trace] = traces(exporter).values()
+    by_id = {event["args"]["span_id"]: event for event in trace}
+
+    def parent_layer(layer: str) -> str | None:
+        [event] = [event for event in trace if event["cat"] == layer]
+        parent_id = event["args"]["parent_id"]
+        return by_id[parent_id]["cat"] if parent_id else None
+
+    assert parent_layer("http") is None
+    assert parent_layer("router") == "http"
+    assert parent_layer("endpoint") == "router"
+    assert parent_layer("service") == "endpoint"
+    assert parent_layer("repository") == "service"
+    # Вложенный span укладывается в родительский
+    for event in trace:
+        parent = by_id.get(event["args"]["parent_id"])
+        if parent is not None:
+            assert parent["ts"] <= event["ts"]
+            assert event["ts"] + event["dur"] <= parent["ts"] + parent["dur"] + 1
+
+
+def test_sampling_is_decided_once_at_the_root(client, exporter, monkeypatch):
+    monkeypatch.setattr(tracer, "sample_rate", 0.2)
+    random.seed(1)
+    requests = 1000
+    for _ in range(requests):
+        client.get("/api/v1/groups")
+
+    grouped = traces(exporter)
+    roots = [event for trace in grouped.values() for event in trace if event["args"]["parent_id"] is None]
+    # Каждая трасса начинается с http: router и service не начинают своих трасс
+    assert len(roots) == len(grouped)
+    assert {root["cat"] for root in roots} == {"http"}
+    assert 0.15 < len(roots) / requests < 0.25
+
+
+def test_unsampled_root_is_not_traced(client, exporter, monkeypatch):
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    client.get("/api/v1/groups")
+    assert not exporter.events
+    assert not tracer.active
+
+
+def test_direct_service_call_starts_its_own_trace(exporter):
+    service = StudentService(InMemoryStudentRepository(memory_storage))
+    asyncio.run(service.get_all_students())
+
+    [trace] = traces(exporter).values()
+    [root] = [event for event in trace if event["args"]["parent_id"] is None]
+    assert root["cat"] == "service"
+    assert {event["cat"] for event in trace} == {"service", "repository"}